@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import graph.io as io
+import graph.stream as stream
+import graph.stats as stats
+import graph.synthetic as synthetic
+
+import info
+import process
+
+import utils.print as gprint
+import utils.table as gtable
+
+DESCRIPTION = 'Benchmark reading and writing of graphs, process.py ' \
+              'operations and info.py fields on synthetic vk.com graphs'
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+# extensions of graph.io formats
+FORMATS = ['.pickle', '.edgelist', '.yaml', '.gml', '.net', '.gexf',
+           '.graphml']
+# text formats are written and read by pure Python code of NetworkX,
+# so they are benchmarked only on graphs up to this size
+MAX_TEXT_FORMAT_NODES = 100000
+
+# number of BFS runs for eccentricity-based info.py fields
+BENCH_MAX_BFS = 16
+
+# relative slowdown or memory growth, which is reported as regression
+DEFAULT_THRESHOLD = 0.2
+# smaller differences in time are considered as noise
+MIN_TIME_DIFF = 0.05
+
+
+def io_benchmarks(directory):
+    """List of (name, function of graph, max number of nodes) for
+    writing and reading of graph in each format."""
+    benchmarks = []
+    for ext in FORMATS:
+        path = os.path.join(directory, 'graph' + ext)
+        max_nodes = None if ext in ('.pickle', '.edgelist') \
+            else MAX_TEXT_FORMAT_NODES
+        benchmarks.append(('io.write' + ext,
+                           lambda graph, path=path:
+                           io.write_graph(graph, path),
+                           max_nodes))
+        benchmarks.append(('io.read' + ext,
+                           lambda graph, path=path: io.read_graph(path),
+                           max_nodes))
+    return benchmarks
+
+
+def process_benchmarks(directory):
+    """List of (name, function of graph, max number of nodes) for
+    process.py operations."""
+    edgelist = os.path.join(directory, 'graph.edgelist')
+    filtered = os.path.join(directory, 'filtered.edgelist')
+
+    def _uids(graph):
+        # filter by 1% of nodes
+        uids = set(graph.nodes()[::100])
+        return process.run_pipeline(graph, [process.uids_stage(uids)])
+
+    def _stream(graph):
+        if not os.path.exists(edgelist):
+            io.write_graph(graph, edgelist)
+        return stream.filter_graph(edgelist, filtered,
+                                   exclude_media_activists=True,
+                                   trims=(3,))
+
+    return [
+        ('process.exclude_media_activists',
+         lambda graph: process.run_pipeline(
+             graph, [process.media_activists_stage(graph)]), None),
+        ('process.uids', _uids, None),
+        ('process.trim',
+         lambda graph: process.run_pipeline(
+             graph, [process.trim_stage(3)]), None),
+        ('process.k_core',
+         lambda graph: process.run_pipeline(
+             graph, [process.k_core_stage(3)]), None),
+        ('process.exclude_alone',
+         lambda graph: process.run_pipeline(
+             graph, [process.trim_stage(1)]), None),
+        ('process.communities', process.assign_communities, None),
+        ('process.stream', _stream, None),
+    ]
+
+
+def info_benchmarks():
+    """List of (name, function of graph, max number of nodes) for
+    info.py fields and averages."""
+    # default values of options of fields
+    defaults = vars(info.build_parser().parse_args(['graph']))
+    defaults['max_bfs'] = BENCH_MAX_BFS
+
+    benchmarks = []
+    for field in info.impl_fields:
+        options = {option: defaults[option]
+                   for option in field.get('options', [])}
+
+        def _column(graph, function=field['function'], options=options):
+            # compute each field from scratch
+            info._metrics.clear()
+            return function(graph, graph.nodes(), **options)
+
+        benchmarks.append(('info.' + field['header'], _column, None))
+
+    benchmarks.append(('info.avg_friends', stats.avg_num_friends, None))
+    benchmarks.append(('info.avg_followers', stats.avg_num_followers, None))
+    benchmarks.append(('info.summary', stats.summary, None))
+    return benchmarks
+
+
+def measure(function, repeat=1, memory=True):
+    """Return tuple (minimal time of repeat runs of function, peak
+    traced memory in bytes of one more run, None if memory is False)."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+
+    peak = None
+    if memory:
+        # tracing slows down allocations, so it is done separately
+        gc.collect()
+        tracemalloc.start()
+        try:
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return min(times), peak
+
+
+def run_benchmarks(sizes, names=None, repeat=1, memory=True, seed=None):
+    """Run benchmarks on synthetic graphs of specified sizes and return
+    list of results: dicts with name, number of nodes, time in seconds,
+    peak memory in bytes, or error message."""
+    results = []
+    directory = tempfile.mkdtemp(prefix='vkstat-bench-')
+    try:
+        for num_nodes in sizes:
+            print('Generate graph with {} nodes...'.format(num_nodes))
+            graph = synthetic.vk_graph(num_nodes, seed=seed)
+
+            benchmarks = (io_benchmarks(directory) +
+                          process_benchmarks(directory) +
+                          info_benchmarks())
+            for name, function, max_nodes in benchmarks:
+                if names and not any(name.startswith(prefix)
+                                     for prefix in names):
+                    continue
+                if max_nodes is not None and num_nodes > max_nodes:
+                    continue
+
+                result = {'name': name, 'num_nodes': num_nodes}
+                try:
+                    # hide messages of benchmarked functions
+                    with open(os.devnull, 'w') as devnull, \
+                            contextlib.redirect_stdout(devnull):
+                        result['time'], result['peak_memory'] = measure(
+                            lambda: function(graph), repeat, memory)
+                except Exception as e:
+                    result['error'] = '{}: {}'.format(type(e).__name__, e)
+                    print('E: {} on {} nodes: {}'.format(
+                        name, num_nodes, result['error']))
+                else:
+                    print('S: {} on {} nodes: {:.3f}s'.format(
+                        name, num_nodes, result['time']))
+                results.append(result)
+
+            # remove files of this graph
+            for filename in os.listdir(directory):
+                os.remove(os.path.join(directory, filename))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Append baseline values to results and mark regressions.
+
+    Return number of regressions.
+
+    """
+    baseline_results = {(result['name'], result['num_nodes']): result
+                        for result in baseline.get('results', [])}
+    num_regressions = 0
+    for result in results:
+        base = baseline_results.get((result['name'], result['num_nodes']))
+        if base is None or 'time' not in base or 'time' not in result:
+            continue
+
+        result['baseline_time'] = base['time']
+        regressions = []
+        if (result['time'] > base['time'] * (1 + threshold) and
+                result['time'] - base['time'] > MIN_TIME_DIFF):
+            regressions.append('time')
+        if (result.get('peak_memory') and base.get('peak_memory') and
+                result['peak_memory'] >
+                base['peak_memory'] * (1 + threshold)):
+            regressions.append('memory')
+        if regressions:
+            result['regression'] = regressions
+            num_regressions += 1
+    return num_regressions
+
+
+def format_results(results):
+    """Return table with results of benchmarks."""
+    def _megabytes(value):
+        return '' if value is None else '{:.1f}'.format(value / 2 ** 20)
+
+    def _change(result):
+        if 'baseline_time' not in result or not result['baseline_time']:
+            return ''
+        return '{:+.0f}%'.format(
+            (result['time'] / result['baseline_time'] - 1) * 100)
+
+    headers = ['Benchmark', 'Nodes', 'Time, s', 'Peak memory, MB',
+               'Change', 'Regression']
+    aligns = ['l', 'r', 'r', 'r', 'r', 'l']
+    columns = [
+        lambda row: results[row]['name'],
+        lambda row: results[row]['num_nodes'],
+        lambda row: ('{:.3f}'.format(results[row]['time'])
+                     if 'time' in results[row] else 'error'),
+        lambda row: _megabytes(results[row].get('peak_memory')),
+        lambda row: _change(results[row]),
+        lambda row: ', '.join(results[row].get('regression', [])),
+    ]
+    return gtable.format_table(headers, aligns, columns,
+                               range(len(results)))
+
+
+def build_parser(prog=None):
+    """Return parser of command line arguments."""
+    parser = argparse.ArgumentParser(prog=prog, description=DESCRIPTION)
+    parser.add_argument('--sizes', metavar='N', type=int, nargs='+',
+                        default=DEFAULT_SIZES,
+                        help='numbers of nodes of synthetic graphs')
+    parser.add_argument('--only', metavar='PREFIX', type=str, nargs='+',
+                        help='run only benchmarks with names, which start '
+                        'with PREFIX, for example: io.read process.trim')
+    parser.add_argument('--repeat', metavar='N', type=int, default=1,
+                        help='report minimal time of N runs')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='do not measure peak memory')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of synthetic graphs')
+    parser.add_argument('-o', '--output', metavar='PATH', type=str,
+                        help='write results in JSON format to PATH')
+    parser.add_argument('--baseline', metavar='PATH', type=str,
+                        help='compare results with results, stored '
+                        'in PATH, and fail on regressions')
+    parser.add_argument('--threshold', metavar='FRACTION', type=float,
+                        default=DEFAULT_THRESHOLD,
+                        help='relative growth of time or memory, '
+                        'reported as regression')
+    return parser
+
+
+def main(args):
+    """Run benchmarks with parsed command line arguments args."""
+    start_time = time.time()
+
+    results = run_benchmarks(args.sizes, args.only, args.repeat,
+                             not args.no_memory, args.seed)
+
+    num_regressions = 0
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            num_regressions = compare(results, json.load(f),
+                                      args.threshold)
+
+    print()
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version.split()[0],
+                       'seed': args.seed,
+                       'results': results}, f, indent=1)
+        print('Write results to: {}'.format(args.output))
+
+    gprint.print_elapsed_time(time.time() - start_time)
+
+    if num_regressions:
+        print('{} regressions against baseline {}.'.format(
+            num_regressions, args.baseline))
+        exit(1)
+
+
+if __name__ == '__main__':
+    main(build_parser().parse_args())
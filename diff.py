@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import sys
+import time
+
+import graph.diff as gdiff
+
+import utils.memory as gmemory
+import utils.print as gprint
+
+DESCRIPTION = 'Compare two snapshots of graph of vk.com users: ' \
+              'print added and removed users and friendships ' \
+              'and changed attributes of users'
+
+OUTPUT_FORMATS = ('text', 'jsonl')
+
+
+def iter_changes(difference):
+    """Iterate over changes from graph.diff.diff as dicts."""
+    for uid in difference['added_nodes'].tolist():
+        yield {'change': 'added_node', 'uid': uid}
+    for uid in difference['removed_nodes'].tolist():
+        yield {'change': 'removed_node', 'uid': uid}
+    for u, v in difference['added_edges'].tolist():
+        yield {'change': 'added_edge', 'u': u, 'v': v}
+    for u, v in difference['removed_edges'].tolist():
+        yield {'change': 'removed_edge', 'u': u, 'v': v}
+    for uid, attr, old, new in difference['changed_attributes']:
+        yield {'change': 'changed_attribute', 'uid': uid, 'attr': attr,
+               'old': old, 'new': new}
+
+
+def format_change(change):
+    """Format change as line of text diff."""
+    kind = change['change']
+    if kind == 'added_node':
+        return '+ {uid}'.format(**change)
+    elif kind == 'removed_node':
+        return '- {uid}'.format(**change)
+    elif kind == 'added_edge':
+        return '+ {u} {v}'.format(**change)
+    elif kind == 'removed_edge':
+        return '- {u} {v}'.format(**change)
+    else:
+        return '~ {uid} {attr}: {old!r} -> {new!r}'.format(**change)
+
+
+def write_changes(difference, f, output_format='text'):
+    """Write changes in text or JSON lines format to file object f."""
+    for change in iter_changes(difference):
+        if output_format == 'text':
+            f.write(format_change(change) + '\n')
+        else:
+            f.write(json.dumps(change, ensure_ascii=False) + '\n')
+
+
+def build_parser(prog=None):
+    """Return parser of command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog=prog, description=DESCRIPTION,
+        epilog='Snapshots in edge list format are compared without '
+        'loading them into NetworkX, snapshots in other formats are '
+        'read into NetworkX graph, which needs much more time and '
+        'memory for large graphs.')
+    parser.add_argument('old', metavar='OLD', type=str,
+                        help='path to older snapshot of graph')
+    parser.add_argument('new', metavar='NEW', type=str,
+                        help='path to newer snapshot of graph')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='text',
+                        help='format of changes')
+    parser.add_argument('-o', '--output', metavar='PATH', type=str,
+                        help='write changes to file, specified by PATH, '
+                        'instead of stdout')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='print only numbers of changes')
+    parser.add_argument('--memory-profiling', metavar='PATH', type=str,
+                        help='write memory usage of reading and comparing '
+                        'in JSON format to file, specified by PATH')
+    return parser
+
+
+def main(args):
+    """Compare graphs with parsed command line arguments args."""
+    out_file = sys.stdout
+    if not args.quiet and not args.output:
+        # keep stdout clean for changes, print messages to stderr
+        sys.stdout = sys.stderr
+
+    if args.memory_profiling:
+        gmemory.start_profiling()
+
+    try:
+        start_time = time.time()
+
+        with gmemory.stage('Diff'):
+            difference = gdiff.diff(args.old, args.new)
+
+        print('Added users: {}'.format(len(difference['added_nodes'])))
+        print('Removed users: {}'.format(len(difference['removed_nodes'])))
+        print('Added friendships: {}'.format(
+            len(difference['added_edges'])))
+        print('Removed friendships: {}'.format(
+            len(difference['removed_edges'])))
+        print('Changed attributes: {}'.format(
+            len(difference['changed_attributes'])))
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                write_changes(difference, f, args.format)
+            print('Write changes to: {}'.format(args.output))
+        elif not args.quiet:
+            write_changes(difference, out_file, args.format)
+    except FileNotFoundError:
+        print('No such file or directory! Quitting...')
+    except ValueError as e:
+        print('E: {}. Quitting...'.format(e))
+    except IOError:
+        print('IOError happened! Quitting...')
+    else:
+        gprint.print_elapsed_time(time.time() - start_time)
+    finally:
+        sys.stdout = out_file
+
+    if args.memory_profiling:
+        gmemory.write_report(args.memory_profiling, 'diff')
+
+
+if __name__ == '__main__':
+    main(build_parser().parse_args())
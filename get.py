@@ -4,25 +4,18 @@
 import argparse
 import time
 import functools
+import os
+import pickle
 import random
 from multiprocessing import Pool
+import queue
 import cProfile
 import pstats
 
-try:
-    import networkx as nx
-except ImportError:
-    print('This script requires NetworkX to be installed.')
-    exit(1)
-
-try:
-    import vkontakte
-except ImportError:
-    print('This script requires vkontakte package to be installed.')
-    print('Download and install it from https://github.com/budnyjj/vkontakte3')
-    exit(1)
+# NetworkX, vkontakte and graph modules are imported only by functions,
+# which use them, so parsing of arguments does not wait for them
 
-import graph.io as io
+import utils.memory as gmemory
 import utils.print as gprint
 
 INIT_TIME_TO_SLEEP_MIN = 0.2
@@ -30,6 +23,79 @@ INIT_TIME_TO_SLEEP_MAX = 2
 TIME_TO_SLEEP_MAX = 5
 TIME_TO_SLEEP_FACTOR = 2
 
+# requests with latency up to this factor of the minimal latency
+# are considered as not delayed by vk.com
+LATENCY_FACTOR = 2
+# number of requests in flight at start of adaptive concurrency mode
+INIT_CONCURRENCY = 2
+# items are sent to pool processes in chunks, at least this number
+# of chunks per process, so slow requests are balanced between them
+CHUNKS_PER_PROCESS = 4
+# maximal number of items in chunk, so progress is updated often
+MAX_CHUNKSIZE = 16
+
+DESCRIPTION = 'Get information about friends of user ' \
+              'with specified UID in social network vk.com'
+
+TOKEN_VK = '2e27464b84d9a9833248daa69ac07ec4e9ef98a05' \
+           '1ad62dd18dc4a51513281a8de4249170a575d40f1332'
+
+DEFAULT_ATTRIBUTES = ['first_name', 'last_name', 'sex']
+
+# number of recent posts per user, which likes are counted
+DEFAULT_LIKES_POSTS = 10
+# maximal number of API calls in one execute request
+EXECUTE_MAX_CALLS = 25
+# maximal number of likers of one post, returned by vk.com
+MAX_LIKERS = 1000
+
+# VKScript code, which returns for each user from list of uids lists
+# of likers of recent posts of this user (one API call per post)
+LIKERS_CODE = '''
+var uids = {uids};
+var result = [];
+var i = 0;
+while (i < uids.length) {{
+    var post_ids = API.wall.get({{"owner_id": uids[i],
+                                 "count": {num_posts}}})@.id;
+    var likers = [];
+    var j = 0;
+    while (j < post_ids.length) {{
+        if (post_ids[j]) {{
+            likers.push(API.likes.getList({{"type": "post",
+                                            "owner_id": uids[i],
+                                            "item_id": post_ids[j],
+                                            "count": {max_likers}}}).users);
+        }}
+        j = j + 1;
+    }}
+    result.push(likers);
+    i = i + 1;
+}}
+return result;
+'''
+
+# vk.com API client, created on first request
+_vk_api = None
+# number of bandwidth limitation errors in this process
+_num_throttled = 0
+
+
+def vk_api():
+    """Return vk.com API client, creating it on first call."""
+    import vkontakte
+
+    global _vk_api
+    if _vk_api is None:
+        _vk_api = vkontakte.API(token=TOKEN_VK)
+    return _vk_api
+
+
+def count_throttling():
+    """Count bandwidth limitation error of vk.com in this process."""
+    global _num_throttled
+    _num_throttled += 1
+
 
 def write_time_profiling_data(profiler, filename):
     """Write time profiling data to file."""
@@ -51,6 +117,11 @@ def args_are_valid(args):
     elif args.pool_size <= 0:
         print('Pool size should be greater than zero!\n')
         raise ValueError
+    elif args.with_likes and \
+            not 0 < args.likes_posts < EXECUTE_MAX_CALLS:
+        print('Number of posts should be greater than zero '
+              'and less than {}!\n'.format(EXECUTE_MAX_CALLS))
+        raise ValueError
     else:
         print('Provided arguments are seem to be correct...\n')
 
@@ -58,6 +129,8 @@ def args_are_valid(args):
 def get_profile(uid, req_fields='first_name, last_name, sex',
                 max_err_count=5):
     """Get information (profile) about user with specified uid."""
+    import vkontakte
+
     answer = None
     error_count = 0
 
@@ -68,11 +141,12 @@ def get_profile(uid, req_fields='first_name, last_name, sex',
     while True:
         try:
             # get only first element of list
-            answer = VK.getProfiles(uids=uid,
-                                    fields=req_fields)[0]
+            answer = vk_api().getProfiles(uids=uid,
+                                          fields=req_fields)[0]
         except vkontakte.VKError as e:
             print('E: profile {}:'.format(uid))
             if e.code == 6:
+                count_throttling()
                 error_count += 1
                 print('   Vk.com bandwith limitations. ', end='')
                 if error_count <= max_err_count:
@@ -106,6 +180,8 @@ def get_profile(uid, req_fields='first_name, last_name, sex',
 def get_friends(profile, req_fields='first_name, last_name, sex',
                 max_err_count=5):
     """Get list with friend profiles of user with specified profile."""
+    import vkontakte
+
     answer = None
     error_count = 0
 
@@ -116,12 +192,13 @@ def get_friends(profile, req_fields='first_name, last_name, sex',
     while True:
         try:
             # get only first element of list
-            answer = VK.friends.get(uid=profile['uid'],
-                                    fields=req_fields)
+            answer = vk_api().friends.get(uid=profile['uid'],
+                                          fields=req_fields)
         except vkontakte.VKError as e:
             print('E: friends of {uid} '
                   '({first_name} {last_name}):'.format(**profile))
             if e.code == 6:  # bandwith limitations
+                count_throttling()
                 error_count += 1
                 print('   Vk.com bandwith limitations. ', end='')
                 if error_count <= max_err_count:
@@ -162,6 +239,8 @@ def get_num_followers(uid, max_err_count=5):
     Return -1 if cannot do so.
 
     """
+    import vkontakte
+
     answer = None
     error_count = 0
 
@@ -171,11 +250,12 @@ def get_num_followers(uid, max_err_count=5):
 
     while True:
         try:
-            answer = VK.subscriptions.getFollowers(uid=uid,
-                                                   count=0)['count']
+            answer = vk_api().subscriptions.getFollowers(
+                uid=uid, count=0)['count']
         except vkontakte.VKError as e:
             print('E: followers of {}:'.format(uid))
             if e.code == 6:
+                count_throttling()
                 error_count += 1
                 print('   Vk.com bandwith limitations. ', end='')
                 if error_count <= max_err_count:
@@ -204,6 +284,232 @@ def get_num_followers(uid, max_err_count=5):
             return answer
 
 
+def get_likers(uids, num_posts=DEFAULT_LIKES_POSTS, max_err_count=5):
+    """Get lists of likers of recent posts of users with specified uids
+    in one execute request.
+
+    Return list with list of liker lists per user, None if cannot do so.
+
+    """
+    import vkontakte
+
+    answer = None
+    error_count = 0
+    code = LIKERS_CODE.format(uids=list(uids), num_posts=num_posts,
+                              max_likers=MAX_LIKERS)
+
+    # used to delay request with errors
+    time_to_sleep = random.uniform(INIT_TIME_TO_SLEEP_MIN,
+                                   INIT_TIME_TO_SLEEP_MAX)
+
+    while True:
+        try:
+            answer = vk_api().execute(code=code)
+        except vkontakte.VKError as e:
+            print('E: likes of {}:'.format(', '.join(map(str, uids))))
+            if e.code == 6:
+                count_throttling()
+                error_count += 1
+                print('   Vk.com bandwith limitations. ', end='')
+                if error_count <= max_err_count:
+                    print('Lets try again in '
+                          '{0}s (#{1})...'.format(time_to_sleep, error_count))
+                    # Need to sleep due to vk.com bandwidth limitations
+                    time.sleep(time_to_sleep)
+
+                    if time_to_sleep <= TIME_TO_SLEEP_MAX:
+                        # exponentially increase time_to_sleep
+                        time_to_sleep *= TIME_TO_SLEEP_FACTOR
+                else:
+                    print('Reached maximal bandwith error count ({0})! '
+                          'Skip...'.format(error_count))
+                    return None
+            else:
+                print('   {}.'.format(e.description))
+                return None
+
+        except Exception as e:
+            print('E: likes of {}:'.format(', '.join(map(str, uids))))
+            print('   {}.'.format(e))
+            return None
+        else:
+            print('S: likes of {} posts of users {}.'.format(
+                sum(map(len, answer)), ', '.join(map(str, uids))))
+            # hidden walls and deleted posts have no likers
+            return [[likers or [] for likers in user_likers]
+                    for user_likers in answer]
+
+
+def read_likers_cache(filename):
+    """Return dict with cached liker lists per uid from file,
+    empty dict if there is no such file."""
+    try:
+        with open(filename, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def write_likers_cache(likers, filename):
+    """Write dict with liker lists per uid to file."""
+    # write to temporary file to keep cache if writing fails
+    with open(filename + '.tmp', 'wb') as f:
+        pickle.dump(likers, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(filename + '.tmp', filename)
+
+
+def count_likes(graph, likers):
+    """Return dict with number of likes per edge of graph.
+
+    Likes are counted only between users, who are already connected
+    by edge, in both directions, at most one like per post.
+
+    """
+    likes = {}
+    for owner, post_likers in likers.items():
+        if owner not in graph:
+            continue
+        neighbors = graph[owner]
+        for users in post_likers:
+            for user in set(users):
+                if user in neighbors:
+                    edge = (min(owner, user), max(owner, user))
+                    likes[edge] = likes.get(edge, 0) + 1
+    return likes
+
+
+class AdaptiveConcurrency:
+    """AIMD controller of number of requests in flight.
+
+    Limit of requests in flight grows by one per round trip (by 1/limit
+    per successful request), while latency of requests stays close to
+    the minimal one, and is halved, when request meets bandwidth
+    limitations of vk.com. Requests, which were sent before the last
+    decrease, do not decrease limit again.
+
+    """
+
+    def __init__(self, max_concurrency, concurrency=INIT_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self.limit = float(min(concurrency, max_concurrency))
+        # number of decreases of limit
+        self.epoch = 0
+        self.min_latency = None
+        # sum and number of limits after each request,
+        # used to report concurrency, on which controller settled
+        self.limit_sum = 0.0
+        self.num_requests = 0
+
+    @property
+    def concurrency(self):
+        """Current limit of requests in flight."""
+        return int(self.limit)
+
+    def reset_latency(self):
+        """Forget minimal latency, when requests of another kind
+        are started."""
+        self.min_latency = None
+
+    def update(self, latency, num_throttled, epoch):
+        """Update limit with latency and number of bandwidth limitation
+        errors of request, sent in epoch."""
+        if num_throttled > 0:
+            if epoch == self.epoch:
+                self.limit = max(self.limit / 2, 1.0)
+                self.epoch += 1
+        else:
+            if self.min_latency is None or latency < self.min_latency:
+                self.min_latency = latency
+            if latency <= self.min_latency * LATENCY_FACTOR:
+                self.limit = min(self.limit + 1 / self.limit,
+                                 float(self.max_concurrency))
+
+        self.limit_sum += self.limit
+        self.num_requests += 1
+
+    def report(self):
+        """Print concurrency, on which controller settled."""
+        if self.num_requests == 0:
+            return
+        print('Adaptive concurrency settled on {} requests in flight '
+              '(average {:.1f}, {} decreases, maximum {}).\n'.format(
+                  self.concurrency, self.limit_sum / self.num_requests,
+                  self.epoch, self.max_concurrency))
+
+
+def measure_request(func, item):
+    """Return tuple (result of func(item), its latency in seconds,
+    number of bandwidth limitation errors during it)."""
+    num_throttled = _num_throttled
+    start_time = time.monotonic()
+    result = func(item)
+    return (result, time.monotonic() - start_time,
+            _num_throttled - num_throttled)
+
+
+def map_with_progress(func, items, title, pool=None, controller=None,
+                      chunksize=1):
+    """Apply func to each of items (in pool, if specified)
+    and show progress.
+
+    Items are sent to pool in chunks of chunksize items. If controller
+    is specified, number of items in flight in pool is limited by its
+    concurrency and items are sent one by one.
+
+    """
+    if controller is not None:
+        return _map_adaptive(func, items, title, pool, controller)
+
+    progress = gprint.Progress(len(items), title)
+    results = []
+    if pool is None:
+        results_iter = map(func, items)
+    else:
+        results_iter = pool.imap(func, items, chunksize)
+    for i, result in enumerate(results_iter):
+        results.append(result)
+        progress.update(i + 1)
+    progress.finish()
+    return results
+
+
+def _map_adaptive(func, items, title, pool, controller):
+    """Apply func to each of items in pool, keeping number of items
+    in flight within concurrency of controller."""
+    progress = gprint.Progress(len(items), title)
+    results = [None] * len(items)
+    # finished items are put here by result handler thread of pool
+    finished = queue.Queue()
+    next_index = 0
+    num_in_flight = 0
+    num_finished = 0
+    controller.reset_latency()
+
+    while num_finished < len(items):
+        while (next_index < len(items) and
+               num_in_flight < controller.concurrency):
+            pool.apply_async(
+                measure_request, (func, items[next_index]),
+                callback=lambda answer, i=next_index, e=controller.epoch:
+                finished.put((i, e, answer, None)),
+                error_callback=lambda error, i=next_index:
+                finished.put((i, None, None, error)))
+            next_index += 1
+            num_in_flight += 1
+
+        index, epoch, answer, error = finished.get()
+        if error is not None:
+            raise error
+        results[index], latency, num_throttled = answer
+        controller.update(latency, num_throttled, epoch)
+        num_in_flight -= 1
+        num_finished += 1
+        progress.update(num_finished)
+
+    progress.finish()
+    return results
+
+
 def strip_attributes(node, preserve_attrs):
     """Strip unnecessary data attributes from node."""
     node_attrs = list(node[1].keys())
@@ -231,8 +537,45 @@ def construct_graph(uids, required_attributes=('first_name',
                                                'sex'),
                     with_num_followers=False,
                     max_recursion_level=1, pool_size=1,
-                    time_profiler=None):
-    """get and build graph data for specified uids."""
+                    time_profiler=None, with_likes=False,
+                    likes_posts=DEFAULT_LIKES_POSTS, likes_cache=None,
+                    adaptive_concurrency=False):
+    """get and build graph data for specified uids.
+
+    If with_likes is True, store number of likes between friends in
+    'weight' attribute of edges. Likers of posts are cached per user
+    in file likes_cache, if it is specified.
+
+    If adaptive_concurrency is True, number of requests in flight
+    is adapted to bandwidth limitations of vk.com, up to pool_size.
+
+    """
+    import networkx as nx
+
+    controller = None
+    if adaptive_concurrency and pool_size > 1:
+        controller = AdaptiveConcurrency(pool_size)
+
+    # apply func to each of items in pool of pool_size processes
+    def _map(func, items, title):
+        if pool_size == 1:
+            # no need to organize pool
+            return map_with_progress(func, items, title)
+
+        # disable profiling, because of new fork processes
+        if time_profiler:
+            time_profiler.disable()
+        # organize multiprocess calculations
+        chunksize = min(max(len(items) // (pool_size * CHUNKS_PER_PROCESS),
+                            1), MAX_CHUNKSIZE)
+        with Pool(processes=pool_size) as pool:
+            results = map_with_progress(func, items, title, pool,
+                                        controller, chunksize)
+        # enable profiling
+        if time_profiler:
+            time_profiler.enable()
+
+        return results
 
     # get list of profiles using get_profile() in multiple processes
     def _get_init_profiles(uids, attrs_string):
@@ -242,23 +585,7 @@ def construct_graph(uids, required_attributes=('first_name',
         req_get_profile = functools.partial(get_profile,
                                             req_fields=attrs_string)
 
-        init_profiles = []
-
-        if pool_size == 1:
-            # no need to organize pool
-            init_profiles = list(map(req_get_profile, uids))
-        else:
-            # disable profiling, because of new fork processes
-            if time_profiler:
-                time_profiler.disable()
-            # organize multiprocessing calculations
-            with Pool(processes=pool_size) as pool:
-                init_profiles = list(pool.map(req_get_profile, uids))
-            # enable profiling
-            if time_profiler:
-                time_profiler.enable()
-
-        return init_profiles
+        return _map(req_get_profile, uids, 'profiles')
 
     # get list of friend profiles, indexed by init_profiles,
     # using get_friends() in multiple processes
@@ -267,23 +594,7 @@ def construct_graph(uids, required_attributes=('first_name',
         req_get_friends = functools.partial(get_friends,
                                             req_fields=attrs_string)
 
-        friend_profiles = []
-
-        if pool_size == 1:
-            # no need to organize pool
-            friend_profiles = list(map(req_get_friends,
-                                       init_profiles))
-        else:
-            # disable profiling, because of new fork processes
-            if time_profiler:
-                time_profiler.disable()
-            # organize multiprocess calculations
-            with Pool(processes=pool_size) as pool:
-                friend_profiles = list(pool.map(req_get_friends,
-                                                init_profiles))
-            # enable profiling
-            if time_profiler:
-                time_profiler.enable()
+        friend_profiles = _map(req_get_friends, init_profiles, 'friends')
 
         print('\nThere are {0} obtained friend profiles on current level '
               'of recursion.\n'.format(sum(map(len, friend_profiles))))
@@ -301,24 +612,8 @@ def construct_graph(uids, required_attributes=('first_name',
                                    for node in nodes if 'friends_total' in node[1]]
 
         # list of user uids, contains only nodes with 'friends_total'
-        num_followers_per_uid = []
-
-        if pool_size == 1:
-            # no need to organize pool
-            num_followers_per_uid = list(
-                map(get_num_followers, uids_with_friends_total))
-        else:
-            # disable profiling, because of new fork processes
-            if time_profiler:
-                time_profiler.disable()
-
-            # organize multiprocess calculations
-            with Pool(processes=pool_size) as pool:
-                num_followers_per_uid = list(pool.map(get_num_followers,
-                                                      uids_with_friends_total))
-            # enable profiling
-            if time_profiler:
-                time_profiler.enable()
+        num_followers_per_uid = _map(get_num_followers,
+                                     uids_with_friends_total, 'followers')
 
         # append number of followers to nodes
         for i, num_followers in enumerate(num_followers_per_uid):
@@ -327,6 +622,35 @@ def construct_graph(uids, required_attributes=('first_name',
                 req_index = all_uids.index(all_uids[i])
                 nodes[req_index][1]['followers_total'] = num_followers
 
+    # get likers of recent posts of users in batched execute requests
+    # and store number of likes between friends as weights of edges
+    def _assign_likes(graph):
+        likers = read_likers_cache(likes_cache) if likes_cache else {}
+        uids = [uid for uid in graph.nodes_iter() if uid not in likers]
+        print('{} users with cached likes.\n'.format(
+            graph.number_of_nodes() - len(uids)))
+
+        # one wall.get call and one likes.getList call per post
+        batch_size = max(EXECUTE_MAX_CALLS // (likes_posts + 1), 1)
+        batches = [uids[i:i + batch_size]
+                   for i in range(0, len(uids), batch_size)]
+        req_get_likers = functools.partial(get_likers,
+                                           num_posts=likes_posts)
+        likers_per_batch = _map(req_get_likers, batches, 'likes')
+
+        # failed requests are not cached, so they are repeated next time
+        for batch, batch_likers in zip(batches, likers_per_batch):
+            if batch_likers is not None:
+                likers.update(zip(batch, batch_likers))
+        if likes_cache:
+            write_likers_cache(likers, likes_cache)
+
+        likes = count_likes(graph, likers)
+        for u, v in graph.edges_iter():
+            graph[u][v]['weight'] = likes.get((min(u, v), max(u, v)), 0)
+        print('There are {} likes between friends.\n'.format(
+            sum(likes.values())))
+
     # convert list of lists to list
     def _flatten(list_of_lists):
         return [e for l in list_of_lists for e in l]
@@ -404,38 +728,42 @@ def construct_graph(uids, required_attributes=('first_name',
     #     'first_name' : 'Roman',
     #     'last_name' : 'Budny',
     #     'uid' : 55358627 }, ...]
-    init_profiles = _get_init_profiles(args.uids, req_attrs_string)
+    with gmemory.stage('Init profiles'):
+        init_profiles = _get_init_profiles(uids, req_attrs_string)
 
     while cur_level < max_recursion_level:
-        print('\nGet friend profiles...')
-        print('Current level of recursion is {0}.\n'.format(cur_level))
+        with gmemory.stage('Recursion level {}'.format(cur_level)):
+            print('\nGet friend profiles...')
+            print('Current level of recursion is {0}.\n'.format(cur_level))
 
-        # list of friends of users, which specified in init_profiles
-        friend_profiles = _get_friend_profiles(init_profiles, req_attrs_string)
+            # list of friends of users, which specified in init_profiles
+            friend_profiles = _get_friend_profiles(init_profiles,
+                                                   req_attrs_string)
 
-        # append information about total number of friends to
-        # profiles in init_profiles
-        _append_num_friends(init_profiles, friend_profiles)
+            # append information about total number of friends to
+            # profiles in init_profiles
+            _append_num_friends(init_profiles, friend_profiles)
 
-        print('Merge obtained friend profiles into graph data...\n')
-        # temporary storage for nodes and edges, use it
-        # because of optimization purpouses
-        all_obtained_nodes = []
-        all_obtained_edges = set()
+            print('Merge obtained friend profiles into graph data...\n')
+            # temporary storage for nodes and edges, use it
+            # because of optimization purpouses
+            all_obtained_nodes = []
+            all_obtained_edges = set()
 
-        # iterate by init list of profile
-        for i, init_profile in enumerate(init_profiles):
-            all_obtained_edges.update(build_edges(init_profile,
-                                                  friend_profiles[i]))
+            # iterate by init list of profile
+            for i, init_profile in enumerate(init_profiles):
+                all_obtained_edges.update(build_edges(
+                    init_profile, friend_profiles[i]))
 
-            all_obtained_nodes.extend(map(profile_to_node, friend_profiles[i]))
-            all_obtained_nodes.append(profile_to_node(init_profile))
+                all_obtained_nodes.extend(map(profile_to_node,
+                                              friend_profiles[i]))
+                all_obtained_nodes.append(profile_to_node(init_profile))
 
-        # append obtained data to graph data accumulator
-        _append_nodes(all_obtained_nodes, gd_accumulator['nodes'])
-        gd_accumulator['edges'].update(all_obtained_edges)
+            # append obtained data to graph data accumulator
+            _append_nodes(all_obtained_nodes, gd_accumulator['nodes'])
+            gd_accumulator['edges'].update(all_obtained_edges)
 
-        init_profiles = _flatten(friend_profiles)
+            init_profiles = _flatten(friend_profiles)
 
         # disable profiling
         if time_profiler:
@@ -447,18 +775,29 @@ def construct_graph(uids, required_attributes=('first_name',
     if time_profiler:
         time_profiler.enable()
 
-    _strip_attributes(gd_accumulator['nodes'], required_attributes)
+    with gmemory.stage('Strip attributes'):
+        _strip_attributes(gd_accumulator['nodes'], required_attributes)
 
     # Get number of followers
     if with_num_followers:
         print('Get number of followers per user...\n')
-        _get_num_followers(gd_accumulator['nodes'])
+        with gmemory.stage('Number of followers'):
+            _get_num_followers(gd_accumulator['nodes'])
 
     print('\nBuild graph with obtained data...\n')
-    graph = nx.Graph()
+    with gmemory.stage('Build graph'):
+        graph = nx.Graph()
 
-    graph.add_nodes_from(gd_accumulator['nodes'])
-    graph.add_edges_from(gd_accumulator['edges'])
+        graph.add_nodes_from(gd_accumulator['nodes'])
+        graph.add_edges_from(gd_accumulator['edges'])
+
+    if with_likes:
+        print('Get likes of recent posts per user...\n')
+        with gmemory.stage('Likes'):
+            _assign_likes(graph)
+
+    if controller is not None:
+        controller.report()
 
     # Disable profiling
     if time_profiler:
@@ -467,21 +806,9 @@ def construct_graph(uids, required_attributes=('first_name',
     return graph
 
 
-DESCRIPTION = 'Get information about friends of user ' \
-              'with specified UID in social network vk.com'
-
-TOKEN_VK = '2e27464b84d9a9833248daa69ac07ec4e9ef98a05' \
-           '1ad62dd18dc4a51513281a8de4249170a575d40f1332'
-
-VK = vkontakte.API(token=TOKEN_VK)
-
-DEFAULT_ATTRIBUTES = ['first_name', 'last_name', 'sex']
-
-time_profiler = None
-
-if __name__ == '__main__':
-    # set cli options
-    parser = argparse.ArgumentParser(description=DESCRIPTION)
+def build_parser(prog=None):
+    """Return parser of command line arguments."""
+    parser = argparse.ArgumentParser(prog=prog, description=DESCRIPTION)
     parser.add_argument('uids', metavar='UID', type=int, nargs='+',
                         help='UID of vk.com user.')
     parser.add_argument('-w', '--write-to', metavar='PATH', type=str,
@@ -500,12 +827,48 @@ if __name__ == '__main__':
                         help='attributes for requesting from vk.com')
     parser.add_argument('--with-num-followers', action='store_true',
                         help='get number of followers per user')
+    parser.add_argument('--adaptive-concurrency', action='store_true',
+                        help='adapt number of requests in flight to '
+                        'bandwidth limitations of vk.com, using pool '
+                        'size as its maximum')
+    parser.add_argument('--with-likes', action='store_true',
+                        help='store number of likes between friends '
+                        'in weight attribute of edges')
+    parser.add_argument('--likes-posts', metavar='N', type=int,
+                        default=DEFAULT_LIKES_POSTS,
+                        help='number of recent posts per user, '
+                        'which likes are counted')
+    parser.add_argument('--likes-cache', metavar='PATH', type=str,
+                        help='read and update likers of posts per user '
+                        'in cache file, specified by PATH')
     parser.add_argument('--time-profiling', metavar='PATH', type=str,
                         help='write speed profile in pStats'
                         'compatible format to file, specified by PATH')
+    parser.add_argument('--memory-profiling', metavar='PATH', type=str,
+                        help='write memory usage of each recursion level '
+                        'in JSON format to file, specified by PATH')
+    parser.add_argument('--progress-events', metavar='PATH', type=str,
+                        help='append progress events in JSON lines '
+                        'format to file, specified by PATH')
+    return parser
 
-    # parse cli options
-    args = parser.parse_args()
+
+def main(args):
+    """Get graph with parsed command line arguments args."""
+    try:
+        import vkontakte  # noqa: F401
+    except ImportError:
+        print('This script requires vkontakte package to be installed.')
+        print('Download and install it from '
+              'https://github.com/budnyjj/vkontakte3')
+        exit(1)
+    import networkx as nx
+    import graph.io as io
+
+    if args.progress_events:
+        gprint.set_progress_events(args.progress_events)
+
+    time_profiler = None
 
     try:
         args_are_valid(args)
@@ -514,29 +877,50 @@ if __name__ == '__main__':
         if args.time_profiling:
             time_profiler = cProfile.Profile()
 
+        if args.memory_profiling:
+            gmemory.start_profiling()
+
         print('Start constructing graph for vk.com users with UIDs:',
               ', '.join(map(str, args.uids)))
         print('Requested data attributes:', ', '.join(args.data_attributes))
         print('Recursion level:', args.recursion_level)
         print('Pool size:', args.pool_size, '\n')
+        if args.adaptive_concurrency:
+            print('Number of requests in flight is adapted '
+                  'up to pool size.\n')
+        if args.with_likes:
+            print('Likes of {} recent posts per user.\n'.format(
+                args.likes_posts))
 
         G = construct_graph(uids=args.uids,
                             required_attributes=tuple(args.data_attributes),
                             with_num_followers=args.with_num_followers,
                             max_recursion_level=args.recursion_level,
                             pool_size=args.pool_size,
-                            time_profiler=time_profiler)
+                            time_profiler=time_profiler,
+                            with_likes=args.with_likes,
+                            likes_posts=args.likes_posts,
+                            likes_cache=args.likes_cache,
+                            adaptive_concurrency=args.adaptive_concurrency)
 
         print(nx.info(G), '\n')
 
-        io.write_graph(G, args.write_to)
+        with gmemory.stage('Write graph'):
+            io.write_graph(G, args.write_to)
 
         if args.time_profiling:
             write_time_profiling_data(time_profiler, args.time_profiling)
 
+        if args.memory_profiling:
+            gmemory.write_report(args.memory_profiling, 'get')
+
     except ValueError:
         print('ValueError happened! Quitting...')
     except IOError:
         print('IOError happened! Quitting...')
     else:
         gprint.print_elapsed_time(time.time() - start_time)
+
+
+if __name__ == '__main__':
+    main(build_parser().parse_args())
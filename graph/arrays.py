@@ -0,0 +1,130 @@
+"""Conversion of graph data to NumPy arrays."""
+
+import itertools
+
+try:
+    import numpy as np
+except ImportError:
+    print('This script requires NumPy to be installed.')
+    exit(1)
+
+
+def attribute_columns(graph, attrs, nodes=None, default=0,
+                      dtype=np.float64):
+    """Collect numeric node attributes of graph into arrays in one pass.
+
+    Return tuple (values, present) of dicts, keyed by attribute name.
+    values[attr] is an array of attribute values, ordered like nodes,
+    with default in place of missing ones; present[attr] is a boolean
+    array, which is True for nodes, that have this attribute.
+
+    """
+    if nodes is None:
+        nodes = graph.nodes()
+
+    num_nodes = len(nodes)
+    values = {attr: np.full(num_nodes, default, dtype=dtype)
+              for attr in attrs}
+    present = {attr: np.zeros(num_nodes, dtype=bool) for attr in attrs}
+
+    node_data = graph.node
+    for i, node in enumerate(nodes):
+        data = node_data[node]
+        for attr in attrs:
+            if attr in data:
+                values[attr][i] = data[attr]
+                present[attr][i] = True
+
+    return values, present
+
+
+def _node_indices(adj, nodes, count):
+    """Return array with positions in nodes of count neighbors of nodes
+    in adjacency adj, -1 for neighbors, which are not in nodes."""
+    def _neighbors():
+        return itertools.chain.from_iterable(adj[node] for node in nodes)
+
+    ids = np.asarray(nodes)
+    if ids.dtype.kind in 'iu':
+        try:
+            neighbors = np.fromiter(_neighbors(), dtype=np.int64,
+                                    count=count)
+        except (TypeError, ValueError, OverflowError):
+            # graph contains nodes, which are not UIDs
+            pass
+        else:
+            # binary search of sorted neighbors in sorted UIDs
+            # is much faster, than lookup of each of them in dict
+            order = np.argsort(ids)
+            sorted_ids = ids[order]
+            query_order = np.argsort(neighbors)
+            queries = neighbors[query_order]
+            pos = np.searchsorted(sorted_ids, queries)
+            pos[pos == len(ids)] = 0
+            found = sorted_ids[pos] == queries if len(ids) else \
+                np.zeros(count, dtype=bool)
+            result = np.full(count, -1, dtype=np.int64)
+            result[query_order[found]] = order[pos[found]]
+            return result
+
+    index = {node: i for i, node in enumerate(nodes)}
+    return np.fromiter(map(index.get, _neighbors(), itertools.repeat(-1)),
+                       dtype=np.int64, count=count)
+
+
+def _csr(graph, nodes, weight, default):
+    if nodes is None:
+        nodes = graph.nodes()
+
+    adj = graph.adj
+    counts = np.fromiter((len(adj[node]) for node in nodes),
+                         dtype=np.int64, count=len(nodes))
+    count = int(counts.sum())
+    rows = np.repeat(np.arange(len(nodes), dtype=np.int64), counts)
+    cols = _node_indices(adj, nodes, count)
+    weights = None
+    if weight is not None:
+        # values of adjacency dicts are in the same order, as neighbors
+        weights = np.fromiter(
+            (data.get(weight, default) for node in nodes
+             for data in adj[node].values()),
+            dtype=np.float64, count=count)
+
+    # skip edges to nodes, which are not in nodes
+    is_known = cols >= 0
+    rows = rows[is_known]
+    cols = cols[is_known]
+
+    # sort neighbors of each node, rows are already sorted
+    order = np.argsort(rows * max(len(nodes), 1) + cols)
+    indices = cols[order]
+    if weights is not None:
+        weights = weights[is_known][order]
+
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(nodes)), out=indptr[1:])
+
+    return indptr, indices, weights
+
+
+def csr_adjacency(graph, nodes=None):
+    """Return adjacency of graph in CSR form as tuple (indptr, indices).
+
+    Nodes are numbered by their position in nodes (all nodes of graph by
+    default), edges to other nodes are skipped. Neighbors of node i are
+    indices[indptr[i]:indptr[i + 1]], sorted in ascending order.
+
+    """
+    indptr, indices, _ = _csr(graph, nodes, None, None)
+    return indptr, indices
+
+
+def weighted_csr_adjacency(graph, nodes=None, weight='weight', default=1.0):
+    """Return weighted adjacency of graph in CSR form as tuple
+    (indptr, indices, weights), like csr_adjacency().
+
+    weights[k] is the value of edge attribute weight of edge to node
+    indices[k], default for edges without this attribute.
+
+    """
+    return _csr(graph, nodes, weight, default)
@@ -0,0 +1,48 @@
+"""Persistent cache of computed graph metrics.
+
+Metrics are stored in sidecar file next to graph file, together with
+size and modification time of graph file. Cached metrics are used only
+if they are the same, so any change of graph file, including attributes
+of nodes and edges, invalidates them. Unlike hash of graph content, key
+of file costs nothing to compute.
+
+"""
+
+import os
+import pickle
+
+CACHE_EXT = '.cache'
+
+
+def cache_path(filename):
+    """Return path to metric cache of graph file."""
+    return filename + CACHE_EXT
+
+
+def file_key(filename):
+    """Return tuple (size, modification time in nanoseconds) of file,
+    which changes, when file is rewritten."""
+    stat = os.stat(filename)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def load_metrics(filename, key):
+    """Return dict with cached metrics of graph file with specified key
+    (see file_key), empty dict if there are no such metrics."""
+    try:
+        with open(filename, 'rb') as f:
+            cached = pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return {}
+
+    if cached.get('key') != key:
+        return {}
+    return cached['metrics']
+
+
+def store_metrics(filename, key, metrics):
+    """Store metrics of graph file with specified key, replacing
+    metrics of any other graph."""
+    with open(filename, 'wb') as f:
+        pickle.dump({'key': key, 'metrics': metrics}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
@@ -0,0 +1,207 @@
+"""Triangles and clustering coefficients of graph nodes.
+
+Nodes are ordered by degree, and each edge is directed from lower to
+higher node, so each node has at most sqrt(2 * m) out-neighbors. Each
+triangle is found once, as pair of out-neighbors of its lowest node,
+which are connected by edge, so all checks are vectorised lookups in
+sorted array of edges.
+
+"""
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    print('This script requires NumPy to be installed.')
+    exit(1)
+
+import graph.arrays as arrays
+import graph.parallel as parallel
+
+# maximal number of checked pairs of out-neighbors in one step
+MAX_PAIRS = 1 << 22
+
+# z-score of 95% confidence interval
+Z_95 = 1.96
+
+
+def oriented_adjacency(indptr, indices):
+    """Return tuple (order, out_indptr, out_indices) of degree-ordered
+    adjacency: node order[i] of source adjacency is node i of result,
+    nodes are sorted by degree, and each node keeps only neighbors with
+    greater number, sorted in ascending order."""
+    num_nodes = len(indptr) - 1
+    degrees = indptr[1:] - indptr[:-1]
+    order = np.argsort(degrees, kind='stable')
+    rank = np.empty(num_nodes, dtype=np.int64)
+    rank[order] = np.arange(num_nodes)
+
+    rows = rank[np.repeat(np.arange(num_nodes), degrees)]
+    cols = rank[indices]
+    is_out = rows < cols
+    rows = rows[is_out]
+    cols = cols[is_out]
+
+    sort = np.lexsort((cols, rows))
+    out_indices = cols[sort]
+    out_indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_nodes), out=out_indptr[1:])
+
+    return order, out_indptr, out_indices
+
+
+def op_triangles(arrays, start, stop):
+    """Number of triangles per node, which have their lowest node
+    in range [start, stop) of degree-ordered adjacency."""
+    indptr = arrays['indptr']
+    indices = arrays['indices']
+    keys = arrays['keys']
+    num_nodes = len(indptr) - 1
+
+    counts = np.zeros(num_nodes, dtype=np.int64)
+    out_degrees = indptr[start + 1:stop + 1] - indptr[start:stop]
+    num_pairs = out_degrees * (out_degrees - 1) // 2
+
+    # split range into steps with bounded number of pairs
+    pair_bounds = np.concatenate(([0], np.cumsum(num_pairs)))
+    step_start = start
+    while step_start < stop:
+        step_stop = np.searchsorted(
+            pair_bounds, pair_bounds[step_start - start] + MAX_PAIRS,
+            side='right') + start - 1
+        step_stop = min(max(step_stop, step_start + 1), stop)
+
+        # positions of first out-neighbors in pairs: each position p
+        # is paired with all following positions in the same row
+        lo = indptr[step_start]
+        hi = indptr[step_stop]
+        positions = np.arange(lo, hi)
+        row_ends = np.repeat(indptr[step_start + 1:step_stop + 1],
+                             out_degrees[step_start - start:
+                                         step_stop - start])
+        num_following = row_ends - positions - 1
+        first = np.repeat(positions, num_following)
+        group_starts = np.cumsum(num_following) - num_following
+        second = (first + 1 + np.arange(len(first)) -
+                  np.repeat(group_starts, num_following))
+
+        u = np.repeat(np.arange(step_start, step_stop),
+                      out_degrees[step_start - start:step_stop - start] *
+                      (out_degrees[step_start - start:
+                                   step_stop - start] - 1) // 2)
+        v = indices[first]
+        w = indices[second]
+
+        pair_keys = v * num_nodes + w
+        found = np.searchsorted(keys, pair_keys)
+        found[found == len(keys)] = 0
+        is_triangle = keys[found] == pair_keys
+
+        for nodes in (u, v, w):
+            counts += np.bincount(nodes[is_triangle], minlength=num_nodes)
+
+        step_start = step_stop
+
+    return counts
+
+
+def edge_keys(indptr, indices):
+    """Return sorted array of keys (row * number of nodes + column) of
+    edges of CSR adjacency with sorted rows."""
+    num_nodes = len(indptr) - 1
+    rows = np.repeat(np.arange(num_nodes), indptr[1:] - indptr[:-1])
+    return rows * num_nodes + indices
+
+
+def triangles(graph, nodes=None, jobs=1):
+    """Return array with number of triangles of each of nodes
+    (all nodes of graph by default), counted in jobs processes."""
+    if nodes is None:
+        nodes = graph.nodes()
+
+    indptr, indices = arrays.csr_adjacency(graph, nodes)
+    order, out_indptr, out_indices = oriented_adjacency(indptr, indices)
+
+    oriented_counts = parallel.sum_nodes(
+        op_triangles, out_indptr, out_indices, jobs=jobs,
+        extra={'keys': edge_keys(out_indptr, out_indices)})
+    counts = np.empty(len(nodes), dtype=np.int64)
+    counts[order] = oriented_counts
+    return counts
+
+
+def num_neighbors(graph, nodes):
+    """Return array with number of neighbors of each of nodes, except
+    the node itself, which is its degree in clustering coefficient,
+    like in networkx.clustering()."""
+    adj = graph.adj
+    return np.fromiter((len(adj[node]) - (node in adj[node])
+                        for node in nodes),
+                       dtype=np.int64, count=len(nodes))
+
+
+def without_self_loops(indptr, indices):
+    """Return tuple (indptr, indices) of CSR adjacency without
+    self-loops."""
+    num_nodes = len(indptr) - 1
+    rows = np.repeat(np.arange(num_nodes), indptr[1:] - indptr[:-1])
+    is_kept = indices != rows
+    new_indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows[is_kept], minlength=num_nodes),
+              out=new_indptr[1:])
+    return new_indptr, indices[is_kept]
+
+
+def clustering(degrees, triangles):
+    """Return array of clustering coefficients of nodes, computed from
+    their degrees (see num_neighbors) and numbers of triangles."""
+    num_pairs = degrees * (degrees - 1) / 2
+    result = np.zeros(len(degrees), dtype=np.float64)
+    has_pairs = num_pairs > 0
+    result[has_pairs] = triangles[has_pairs] / num_pairs[has_pairs]
+    return result
+
+
+def estimate_avg_clustering(graph, num_samples, seed=None):
+    """Estimate average clustering coefficient of graph by sampling.
+
+    For each of num_samples random nodes check, if random pair of its
+    neighbors is connected (nodes with less than two neighbors are
+    counted as not connected). Self-loops are ignored, like
+    in networkx.clustering(). Return tuple (estimate, lower, upper)
+    with 95% confidence interval, zeros for graph without nodes.
+
+    """
+    nodes = graph.nodes()
+    num_nodes = len(nodes)
+    if num_nodes == 0:
+        return 0.0, 0.0, 0.0
+
+    indptr, indices = without_self_loops(
+        *arrays.csr_adjacency(graph, nodes))
+    degrees = indptr[1:] - indptr[:-1]
+
+    rng = np.random.RandomState(seed)
+    samples = rng.randint(0, num_nodes, size=num_samples)
+    samples = samples[degrees[samples] >= 2]
+    sample_degrees = degrees[samples]
+
+    # random pair of distinct neighbors of each sample
+    first = (rng.random_sample(len(samples)) * sample_degrees).astype(
+        np.int64)
+    second = (rng.random_sample(len(samples)) *
+              (sample_degrees - 1)).astype(np.int64)
+    second += second >= first
+    v = indices[indptr[samples] + first]
+    w = indices[indptr[samples] + second]
+
+    keys = edge_keys(indptr, indices)
+    pair_keys = v * num_nodes + w
+    found = np.searchsorted(keys, pair_keys)
+    found[found == len(keys)] = 0
+    num_connected = (keys[found] == pair_keys).sum()
+
+    estimate = float(num_connected / num_samples)
+    margin = Z_95 * math.sqrt(estimate * (1 - estimate) / num_samples)
+    return estimate, max(estimate - margin, 0.0), min(estimate + margin, 1.0)
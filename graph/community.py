@@ -0,0 +1,106 @@
+"""Community detection in graph by label propagation.
+
+Each node starts in its own community, and on each iteration takes
+the most frequent label of its neighbors, keeping its own label on ties.
+Only random half of nodes is updated on each iteration, which prevents
+oscillations of synchronous propagation. All nodes are processed at once
+with NumPy sorting over CSR adjacency.
+
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    print('This script requires NumPy to be installed.')
+    exit(1)
+
+import graph.arrays as arrays
+
+DEFAULT_MAX_ITER = 100
+# stop, when fraction of changed labels falls below this value
+DEFAULT_TOL = 1.0e-4
+
+
+def propagate_labels(indptr, indices, max_iter=DEFAULT_MAX_ITER,
+                     tol=DEFAULT_TOL, seed=None):
+    """Return array of community labels of nodes of CSR adjacency."""
+    num_nodes = len(indptr) - 1
+    labels = np.arange(num_nodes, dtype=np.int64)
+    if len(indices) == 0:
+        return labels
+
+    rng = np.random.RandomState(seed)
+    rows = np.repeat(np.arange(num_nodes), indptr[1:] - indptr[:-1])
+
+    for _ in range(max_iter):
+        # update labels of random half of nodes
+        is_updated = rng.random_sample(num_nodes) < 0.5
+        is_updated_entry = is_updated[rows]
+
+        # count labels of neighbors of each updated node
+        keys, counts = np.unique(
+            rows[is_updated_entry] * num_nodes +
+            labels[indices[is_updated_entry]], return_counts=True)
+        if len(keys) == 0:
+            continue
+        key_rows = keys // num_nodes
+        key_labels = keys % num_nodes
+
+        # own label wins ties, other ties are broken randomly
+        scores = (counts + 0.5 * (key_labels == labels[key_rows]) +
+                  0.4 * rng.random_sample(len(keys)))
+
+        # keys are sorted, so keys of each row form a group
+        group_starts = np.flatnonzero(np.diff(key_rows, prepend=-1))
+        group_sizes = np.diff(np.append(group_starts, len(keys)))
+        best_scores = np.maximum.reduceat(scores, group_starts)
+        best = np.flatnonzero(scores == np.repeat(best_scores, group_sizes))
+        # take the first of equal best keys of each row
+        best = best[np.diff(key_rows[best], prepend=-1) != 0]
+
+        best_rows = key_rows[best]
+        changed = key_labels[best] != labels[best_rows]
+        labels[best_rows[changed]] = key_labels[best][changed]
+
+        if changed.sum() < tol * num_nodes:
+            break
+
+    return labels
+
+
+def relabel_by_size(labels):
+    """Renumber communities by size: 0 is the largest one."""
+    _, inverse, sizes = np.unique(labels, return_inverse=True,
+                                  return_counts=True)
+    rank = np.empty(len(sizes), dtype=np.int64)
+    rank[np.argsort(-sizes, kind='stable')] = np.arange(len(sizes))
+    return rank[inverse]
+
+
+def modularity(indptr, indices, labels):
+    """Modularity of partition of nodes of CSR adjacency into
+    communities."""
+    num_edges = len(indices) / 2
+    if num_edges == 0:
+        return 0.0
+
+    degrees = indptr[1:] - indptr[:-1]
+    rows = np.repeat(np.arange(len(degrees)), degrees)
+    inner = (labels[rows] == labels[indices]).sum() / 2
+    community_degrees = np.bincount(labels, weights=degrees)
+    return float(inner / num_edges -
+                 ((community_degrees / (2 * num_edges)) ** 2).sum())
+
+
+def communities(graph, nodes=None, max_iter=DEFAULT_MAX_ITER,
+                tol=DEFAULT_TOL, seed=None):
+    """Return tuple (labels, modularity): array of community numbers of
+    nodes (all nodes by default), 0 is the largest community, and
+    modularity of this partition."""
+    if nodes is None:
+        nodes = graph.nodes()
+
+    indptr, indices = arrays.csr_adjacency(graph, nodes)
+    labels = relabel_by_size(propagate_labels(indptr, indices, max_iter,
+                                              tol, seed))
+    return labels, modularity(indptr, indices, labels)
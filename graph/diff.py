@@ -0,0 +1,182 @@
+"""Difference between two snapshots of graph of vk.com users.
+
+Nodes and edges of each snapshot are stored in sorted arrays of integer
+keys (UID for node, row with pair of UIDs for edge), so added and
+removed ones are found by merging of sorted arrays instead of comparing
+sets of Python objects. Graphs in edge list format are read without
+building NetworkX graph, other formats are read into NetworkX graph
+first.
+
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    print('This script requires NumPy to be installed.')
+    exit(1)
+
+import graph.io as io
+import graph.stream as stream
+
+# keys with values, which fit into this number of bits, are sorted
+# as one packed 64-bit integer, others with slower lexicographic sort
+PACKED_BITS = 31
+
+
+def _sort_order(keys):
+    """Return stable sorting order of array of keys or rows of keys."""
+    if keys.ndim == 1:
+        return np.argsort(keys, kind='stable')
+    if len(keys) == 0 or \
+            (keys.min() >= 0 and keys.max() < 2 ** PACKED_BITS):
+        return np.argsort((keys[:, 0] << PACKED_BITS) | keys[:, 1],
+                          kind='stable')
+    return np.lexsort((keys[:, 1], keys[:, 0]))
+
+
+def _is_repeated(keys):
+    """Return boolean array, which is True for each key of sorted keys,
+    which is equal to previous one."""
+    is_equal = keys[1:] == keys[:-1]
+    if keys.ndim > 1:
+        is_equal = is_equal.all(axis=1)
+    return is_equal
+
+
+def _sorted_unique(keys):
+    keys = np.sort(keys) if keys.ndim == 1 else keys[_sort_order(keys)]
+    is_first = np.ones(len(keys), dtype=bool)
+    is_first[1:] = ~_is_repeated(keys)
+    return keys[is_first]
+
+
+def node_keys(nodes):
+    """Return sorted array of unique UIDs of nodes."""
+    return _sorted_unique(np.fromiter(nodes, dtype=np.int64))
+
+
+def edge_keys(uids):
+    """Return array of shape (m, 2) of unique undirected edges, specified
+    as array of shape (m, 2) with pairs of UIDs, with smaller UID first,
+    sorted lexicographically."""
+    return _sorted_unique(np.sort(uids, axis=1))
+
+
+def merge_diff(old, new):
+    """Return tuple (added, removed) of arrays with keys, which are
+    only in new or only in old sorted array of unique keys (or rows
+    of keys)."""
+    keys = np.concatenate((old, new))
+    # stable sort of two sorted runs is their linear merge
+    order = _sort_order(keys)
+    merged = keys[order]
+
+    is_common = np.zeros(len(merged), dtype=bool)
+    is_pair = _is_repeated(merged)
+    is_common[:-1] |= is_pair
+    is_common[1:] |= is_pair
+
+    is_new = order >= len(old)
+    return merged[~is_common & is_new], merged[~is_common & ~is_new]
+
+
+def _parse_uid(node):
+    uid = stream.parse_node(node)
+    if not isinstance(uid, int):
+        raise ValueError('Node {!r} is not UID'.format(node))
+    return uid
+
+
+def read_node_rows(filename):
+    """Return tuple (header, rows) of node table file, where rows is
+    dict with unparsed row of each UID."""
+    rows = {}
+    with open(filename, 'r') as f:
+        header = tuple(f.readline().rstrip('\n').split('\t'))
+        for line in f:
+            rows[_parse_uid(line.split('\t', 1)[0])] = line.rstrip('\n')
+    return header, rows
+
+
+def read_snapshot(filename):
+    """Return tuple (node keys, edge keys, attributes) of graph, stored
+    in file.
+
+    Attributes are tuple (header, rows): header of node table and dict
+    with its unparsed rows by UID for graph in edge list format, or
+    None and dict with attributes by UID for other formats.
+
+    """
+    if filename.endswith('.edgelist'):
+        edges = edge_keys(stream.read_edge_array(filename))
+        try:
+            attrs = read_node_rows(stream.node_table_path(filename))
+        except FileNotFoundError:
+            attrs = (None, {})
+        nodes = _sorted_unique(np.concatenate(
+            (node_keys(attrs[1]), edges.ravel())))
+    else:
+        graph = io.read_graph(filename)
+        # some formats store UIDs as strings
+        attrs = (None, {_parse_uid(node): data
+                        for node, data in graph.nodes_iter(data=True)})
+        edges = edge_keys(np.fromiter(
+            (_parse_uid(node) for edge in graph.edges_iter()
+             for node in edge), dtype=np.int64).reshape(-1, 2))
+        nodes = node_keys(attrs[1])
+        del graph
+    return nodes, edges, attrs
+
+
+def _node_data(attrs, uid):
+    header, rows = attrs
+    if header is None:
+        return rows.get(uid, {})
+    elif uid in rows:
+        return stream.parse_node_data(header, rows[uid].split('\t'))
+    return {}
+
+
+def changed_attributes(old_attrs, new_attrs, uids):
+    """Iterate over tuples (UID, attribute, old value, new value)
+    of attributes, changed between snapshots, of nodes with UIDs.
+
+    Rows of node tables with the same header are parsed only if they
+    differ.
+
+    """
+    same_header = (old_attrs[0] is not None and
+                   old_attrs[0] == new_attrs[0])
+    for uid in uids:
+        if same_header and \
+                old_attrs[1].get(uid) == new_attrs[1].get(uid):
+            continue
+        old_data = _node_data(old_attrs, uid)
+        new_data = _node_data(new_attrs, uid)
+        for attr in sorted(set(old_data) | set(new_data)):
+            old_value = old_data.get(attr)
+            new_value = new_data.get(attr)
+            if old_value != new_value:
+                yield uid, attr, old_value, new_value
+
+
+def diff(old_filename, new_filename):
+    """Return dict with difference between graphs, stored in files:
+    arrays of added and removed nodes, arrays of shape (m, 2) of added
+    and removed edges and list of changed attributes of common nodes
+    (see changed_attributes)."""
+    old_nodes, old_edges, old_attrs = read_snapshot(old_filename)
+    new_nodes, new_edges, new_attrs = read_snapshot(new_filename)
+
+    added_nodes, removed_nodes = merge_diff(old_nodes, new_nodes)
+    added_edges, removed_edges = merge_diff(old_edges, new_edges)
+    common_nodes = np.intersect1d(old_nodes, new_nodes, assume_unique=True)
+
+    return {
+        'added_nodes': added_nodes,
+        'removed_nodes': removed_nodes,
+        'added_edges': added_edges,
+        'removed_edges': removed_edges,
+        'changed_attributes': list(changed_attributes(
+            old_attrs, new_attrs, common_nodes.tolist())),
+    }
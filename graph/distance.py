@@ -0,0 +1,195 @@
+"""Distance-related characteristics of graph, computed from
+eccentricities of its nodes.
+
+Eccentricities are bounded by BFS from a few selected nodes (Takes
+and Kosters, "Computing the Eccentricity Distribution of Large Graphs",
+2013), several of which can run at once in worker processes. Bounds
+are refined, until they are enough to find exact radius, diameter,
+center and periphery, which usually takes a small number of BFS runs
+on social graphs. Bounds from a limited number of BFS runs give
+approximate values with guaranteed error.
+
+"""
+
+try:
+    import networkx as nx
+except ImportError:
+    print('This script requires NetworkX to be installed.')
+    exit(1)
+
+try:
+    import numpy as np
+except ImportError:
+    print('This script requires NumPy to be installed.')
+    exit(1)
+
+import graph.arrays as arrays
+import graph.parallel as parallel
+
+
+def neighbors(indptr, indices, frontier):
+    """Return concatenated neighbors of frontier nodes in CSR adjacency."""
+    starts = indptr[frontier]
+    counts = indptr[frontier + 1] - starts
+    total = counts.sum()
+    if total == 0:
+        return indices[:0]
+
+    # position of each neighbor inside of its row
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts,
+                                           counts)
+    return indices[np.repeat(starts, counts) + offsets]
+
+
+def bfs_distances(indptr, indices, source):
+    """Return array of distances from source to all nodes, -1 for nodes,
+    which are not reachable from source."""
+    distances = np.full(len(indptr) - 1, -1, dtype=np.int64)
+    distances[source] = 0
+
+    frontier = np.array([source], dtype=np.int64)
+    level = 0
+    while len(frontier):
+        level += 1
+        candidates = neighbors(indptr, indices, frontier)
+        candidates = np.unique(candidates[distances[candidates] < 0])
+        distances[candidates] = level
+        frontier = candidates
+
+    return distances
+
+
+def op_bfs_bounds(arrays, start, stop):
+    """Bounds (lower, upper) of eccentricities of all nodes, found
+    by BFS from nodes in range [start, stop), or None, if graph
+    is not connected."""
+    indptr = arrays['indptr']
+    indices = arrays['indices']
+    num_nodes = len(indptr) - 1
+    lower = np.zeros(num_nodes, dtype=np.int64)
+    upper = np.full(num_nodes, num_nodes, dtype=np.int64)
+    for source in range(start, stop):
+        distances = bfs_distances(indptr, indices, source)
+        if (distances < 0).any():
+            return None
+        ecc = distances.max()
+        np.maximum(lower, np.maximum(distances, ecc - distances), out=lower)
+        np.minimum(upper, ecc + distances, out=upper)
+    return lower, upper
+
+
+def select_sources(candidates, degrees, lower, upper, first, count):
+    """Return list of count candidate nodes, which are sources of the
+    next BFS runs: alternately candidate with the largest upper bound
+    and with the smallest lower bound, starting with the former
+    if first is even. High degree nodes are preferred."""
+    index = candidates.nonzero()[0]
+    by_upper = index[np.lexsort((-degrees[index], -upper[index]))]
+    by_lower = index[np.lexsort((-degrees[index], lower[index]))]
+
+    sources = []
+    selected = set()
+    positions = [0, 0]
+    for n in range(first, first + min(count, len(index))):
+        order = by_upper if n % 2 == 0 else by_lower
+        position = positions[n % 2]
+        while order[position] in selected:
+            position += 1
+        positions[n % 2] = position + 1
+        sources.append(int(order[position]))
+        selected.add(sources[-1])
+    return sources
+
+
+def eccentricity_bounds(graph, nodes=None, max_bfs=None, jobs=1):
+    """Return tuple (lower, upper) of arrays of bounds of eccentricities
+    of nodes (all nodes by default).
+
+    If max_bfs is not specified, bounds are refined, until they determine
+    radius, diameter, center and periphery exactly: every node either has
+    lower == upper, or cannot be central or peripheral. Otherwise, stop
+    after max_bfs BFS runs, but at least one BFS is run to check, that
+    graph is connected.
+
+    Each round runs BFS from jobs sources in jobs worker processes.
+
+    Raise NetworkXError, if graph is not connected.
+
+    """
+    if nodes is None:
+        nodes = graph.nodes()
+    num_nodes = len(nodes)
+    if num_nodes == 0:
+        raise nx.NetworkXError('Graph has no nodes.')
+
+    indptr, indices = arrays.csr_adjacency(graph, nodes)
+    degrees = indptr[1:] - indptr[:-1]
+
+    lower = np.zeros(num_nodes, dtype=np.int64)
+    upper = np.full(num_nodes, num_nodes, dtype=np.int64)
+    candidates = np.ones(num_nodes, dtype=bool)
+
+    num_bfs = 0
+    with parallel.shared_pool(indptr, indices, jobs) as apply:
+        while candidates.any():
+            count = jobs
+            if max_bfs is not None:
+                count = min(count, max(max_bfs, 1) - num_bfs)
+                if count <= 0:
+                    break
+
+            sources = select_sources(candidates, degrees, lower, upper,
+                                     num_bfs, count)
+            num_bfs += len(sources)
+            for _, bounds in apply(op_bfs_bounds,
+                                   [(source, source + 1)
+                                    for source in sources]):
+                if bounds is None:
+                    raise nx.NetworkXError('Graph not connected: '
+                                           'infinite path length')
+                np.maximum(lower, bounds[0], out=lower)
+                np.minimum(upper, bounds[1], out=upper)
+
+            # node is resolved, if its eccentricity is known, or if it
+            # can be neither in periphery, nor in center
+            candidates &= ~((lower == upper) |
+                            ((upper < lower.max()) & (lower > upper.min())))
+
+    return lower, upper
+
+
+def radius_bounds(lower, upper):
+    """Tuple (lower, upper) of bounds of graph radius."""
+    return int(lower.min()), int(upper.min())
+
+
+def diameter_bounds(lower, upper):
+    """Tuple (lower, upper) of bounds of graph diameter."""
+    return int(lower.max()), int(upper.max())
+
+
+def center_bounds(nodes, lower, upper):
+    """Tuple (certain, possible) of lists of central nodes. Lists are
+    equal, if bounds determine center exactly."""
+    rad_lower, rad_upper = radius_bounds(lower, upper)
+    return ([nodes[i] for i in (upper <= rad_lower).nonzero()[0]],
+            [nodes[i] for i in (lower <= rad_upper).nonzero()[0]])
+
+
+def periphery_bounds(nodes, lower, upper):
+    """Tuple (certain, possible) of lists of peripheral nodes. Lists are
+    equal, if bounds determine periphery exactly."""
+    diam_lower, diam_upper = diameter_bounds(lower, upper)
+    return ([nodes[i] for i in (lower >= diam_upper).nonzero()[0]],
+            [nodes[i] for i in (upper >= diam_lower).nonzero()[0]])
+
+
+def bounded_center(graph):
+    """List of central nodes of graph, found with eccentricity bounds.
+
+    Raise NetworkXError, if graph is not connected.
+
+    """
+    nodes = graph.nodes()
+    certain, _ = center_bounds(nodes, *eccentricity_bounds(graph, nodes))
+    return certain
@@ -9,6 +9,8 @@ except ImportError:
     print('This script requires NetworkX to be installed.')
     exit(1)
 
+import graph.stream as stream
+
 def exclude_complex_attrs(graph):
     """Exclude complex attributes from graph."""
     # make copy of graph to count neighbors per node
@@ -53,6 +55,15 @@ def read_graph(filename):
     elif filename.endswith('.graphml'):
         graph = nx.read_graphml(filename)
         print('Read graph from {0} in GraphML format.'.format(filename))
+    elif filename.endswith('.edgelist'):
+        graph = nx.Graph()
+        graph.add_edges_from(stream.read_edges(filename))
+        try:
+            graph.add_nodes_from(
+                stream.read_node_table(stream.node_table_path(filename)))
+        except FileNotFoundError:
+            pass
+        print('Read graph from {0} in edge list format.'.format(filename))
     else:
         with open(filename, 'rb') as f:
             graph = pickle.load(f)
@@ -98,6 +109,15 @@ def write_graph(graph, filename):
         nx.write_graphml(graph, filename)
         print('Write constructed graph to: {0} '
               'in GraphML format.'.format(filename))
+    elif filename.endswith('.edgelist'):
+        # weights of edges are written in the third column
+        with open(filename, 'w') as f:
+            for u, v, data in graph.edges_iter(data=True):
+                f.write(stream.format_edge(u, v, data))
+        stream.write_node_table(graph.nodes_iter(data=True),
+                                stream.node_table_path(filename))
+        print('Write constructed graph to: {0} '
+              'in edge list format.'.format(filename))
     else:
         with open(filename, 'wb') as f:
             pickle.dump(graph, f, protocol=pickle.HIGHEST_PROTOCOL)
@@ -0,0 +1,220 @@
+"""Force-directed layout of graph nodes.
+
+Nodes repel each other and edges pull their ends together, as in
+Fruchterman-Reingold layout. Repulsion is approximated like in
+Barnes-Hut algorithm: space is split into quadtree of uniform grids,
+and each node interacts with centers of mass of well-separated cells
+of each level (children of neighbors of its parent cell, which are not
+its own neighbors), and directly only with nodes of neighboring cells of
+the finest level. Crowded cells of the finest level act as their center
+of mass too, so each iteration costs O(n log n) vectorised operations
+even if many nodes are close together.
+
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    print('This script requires NumPy to be installed.')
+    exit(1)
+
+import graph.arrays as arrays
+
+DEFAULT_NUM_ITER = 50
+# maximal node displacement on first iteration, relative to layout size
+DEFAULT_TEMPERATURE = 0.1
+# maximal depth of quadtree
+MAX_LEVEL = 10
+# minimal distance between nodes, prevents division by zero
+MIN_DISTANCE = 1.0e-9
+# nodes of cells of the finest level with more nodes repel nodes
+# of neighboring cells as their center of mass, which bounds number
+# of exactly computed pairs of nodes
+MAX_CELL_NODES = 32
+
+# offsets of children of 3x3 parent neighbors from first child
+_CHILD_OFFSETS = range(-2, 4)
+
+
+def _num_levels(num_nodes):
+    """Depth of quadtree, so that finest cells contain few nodes."""
+    level = 1
+    while 4 ** level < num_nodes and level < MAX_LEVEL:
+        level += 1
+    return level
+
+
+def _cells(cell_pos, level):
+    """Return tuple (x, y) of cells of nodes at quadtree level."""
+    size = 1 << level
+    cells = np.minimum((cell_pos * size).astype(np.int64), size - 1)
+    return cells[:, 0], cells[:, 1]
+
+
+def _repulsion(delta, mass, k):
+    """Repulsive force k^2 * mass / d, directed along delta."""
+    dist2 = np.maximum((delta ** 2).sum(axis=-1), MIN_DISTANCE ** 2)
+    return delta * (k * k * mass / dist2)[..., np.newaxis]
+
+
+def far_repulsion(pos, cell_pos, level, k):
+    """Repulsion of nodes from well-separated cells of quadtree level."""
+    size = 1 << level
+    cx, cy = _cells(cell_pos, level)
+    cell_ids = cx * size + cy
+    mass = np.bincount(cell_ids, minlength=size * size).astype(np.float64)
+    has_mass = mass > 0
+    px = pos[:, 0]
+    py = pos[:, 1]
+    center_x = np.bincount(cell_ids, weights=px, minlength=size * size)
+    center_y = np.bincount(cell_ids, weights=py, minlength=size * size)
+    center_x[has_mass] /= mass[has_mass]
+    center_y[has_mass] /= mass[has_mass]
+    mass *= k * k
+
+    # children of 3x3 neighbors of parent cell, which are not
+    # neighbors of node cell
+    fx = np.zeros(len(pos))
+    fy = np.zeros(len(pos))
+    first_x = cx & ~1
+    first_y = cy & ~1
+    for dx in _CHILD_OFFSETS:
+        x = first_x + dx
+        is_far_x = np.abs(x - cx) > 1
+        is_valid_x = (x >= 0) & (x < size)
+        for dy in _CHILD_OFFSETS:
+            y = first_y + dy
+            is_valid = (is_valid_x & (y >= 0) & (y < size) &
+                        (is_far_x | (np.abs(y - cy) > 1)))
+            ids = np.where(is_valid, x * size + y, 0)
+            delta_x = px - center_x[ids]
+            delta_y = py - center_y[ids]
+            scale = mass[ids] * is_valid / np.maximum(
+                delta_x * delta_x + delta_y * delta_y, MIN_DISTANCE ** 2)
+            fx += delta_x * scale
+            fy += delta_y * scale
+    return np.column_stack((fx, fy))
+
+
+def near_repulsion(pos, cell_pos, level, k):
+    """Exact repulsion of nodes from nodes of neighboring cells
+    of quadtree level, and approximate one from neighboring cells
+    with more than MAX_CELL_NODES nodes."""
+    size = 1 << level
+    num_nodes = len(pos)
+    cx, cy = _cells(cell_pos, level)
+    cell_ids = cx * size + cy
+    order = np.argsort(cell_ids, kind='stable')
+    counts = np.bincount(cell_ids, minlength=size * size)
+    starts = np.cumsum(counts) - counts
+    is_crowded = counts > MAX_CELL_NODES
+    sums = np.column_stack([np.bincount(cell_ids, weights=pos[:, axis],
+                                        minlength=size * size)
+                            for axis in range(2)])
+
+    forces = np.zeros((num_nodes, 2))
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            x = cx + dx
+            y = cy + dy
+            is_valid = (x >= 0) & (x < size) & (y >= 0) & (y < size)
+            ids = np.where(is_valid, x * size + y, 0)
+
+            # crowded cells act as center of mass of their nodes,
+            # except node itself
+            is_approx = is_valid & is_crowded[ids]
+            if is_approx.any():
+                mass = counts[ids] - (dx == 0 and dy == 0)
+                mass = np.where(is_approx, mass, 0)
+                center = sums[ids]
+                if dx == 0 and dy == 0:
+                    center = center - pos
+                center /= np.maximum(mass, 1)[:, np.newaxis]
+                forces += _repulsion(pos - center, mass, k)
+
+            pair_counts = counts[ids] * (is_valid & ~is_approx)
+
+            # pairs of nodes and all nodes in their neighbor cell
+            sources = np.repeat(np.arange(num_nodes), pair_counts)
+            group_starts = np.cumsum(pair_counts) - pair_counts
+            targets = order[np.repeat(starts[ids], pair_counts) +
+                            np.arange(len(sources)) -
+                            np.repeat(group_starts, pair_counts)]
+            is_other = sources != targets
+
+            pair_forces = _repulsion(pos[sources] - pos[targets],
+                                     is_other.astype(np.float64), k)
+            for axis in range(2):
+                forces[:, axis] += np.bincount(sources,
+                                               weights=pair_forces[:, axis],
+                                               minlength=num_nodes)
+    return forces
+
+
+def attraction(pos, indptr, indices, k):
+    """Attractive force d^2 / k of edges of CSR adjacency."""
+    num_nodes = len(pos)
+    rows = np.repeat(np.arange(num_nodes), indptr[1:] - indptr[:-1])
+    delta = pos[indices] - pos[rows]
+    dist = np.sqrt((delta ** 2).sum(axis=1))
+    edge_forces = delta * (dist / k)[:, np.newaxis]
+
+    forces = np.zeros((num_nodes, 2))
+    for axis in range(2):
+        forces[:, axis] = np.bincount(rows, weights=edge_forces[:, axis],
+                                      minlength=num_nodes)
+    return forces
+
+
+def force_layout(indptr, indices, num_iter=DEFAULT_NUM_ITER,
+                 temperature=DEFAULT_TEMPERATURE, pos=None, seed=None):
+    """Return array of shape (n, 2) with positions of nodes of CSR
+    adjacency in unit square.
+
+    Start from positions pos, or from random ones, if it is not
+    specified. Maximal displacement of nodes decreases linearly
+    from temperature to zero during num_iter iterations.
+
+    """
+    num_nodes = len(indptr) - 1
+    if pos is None:
+        pos = np.random.RandomState(seed).random_sample((num_nodes, 2))
+    else:
+        pos = np.array(pos, dtype=np.float64)
+    if num_nodes < 2:
+        return pos
+
+    k = 1.0 / np.sqrt(num_nodes)
+    num_levels = _num_levels(num_nodes)
+
+    for i in range(num_iter):
+        # positions of nodes relative to bounding square of layout
+        low = pos.min(axis=0)
+        extent = max((pos.max(axis=0) - low).max(), MIN_DISTANCE)
+        cell_pos = (pos - low) / extent
+
+        forces = attraction(pos, indptr, indices, k)
+        forces += near_repulsion(pos, cell_pos, num_levels, k)
+        for level in range(2, num_levels + 1):
+            forces += far_repulsion(pos, cell_pos, level, k)
+
+        # limit displacement by current temperature
+        step = temperature * (1 - i / num_iter)
+        length = np.maximum(np.sqrt((forces ** 2).sum(axis=1)),
+                            MIN_DISTANCE)
+        pos += forces * (np.minimum(length, step) / length)[:, np.newaxis]
+
+    # fit layout into unit square
+    low = pos.min(axis=0)
+    extent = max((pos.max(axis=0) - low).max(), MIN_DISTANCE)
+    return (pos - low) / extent
+
+
+def layout(graph, nodes=None, num_iter=DEFAULT_NUM_ITER, seed=None):
+    """Return array of shape (n, 2) with positions of nodes
+    (all nodes of graph by default) in unit square."""
+    if nodes is None:
+        nodes = graph.nodes()
+
+    indptr, indices = arrays.csr_adjacency(graph, nodes)
+    return force_layout(indptr, indices, num_iter=num_iter, seed=seed)
@@ -0,0 +1,191 @@
+"""Parallel per-node computations over CSR adjacency of graph.
+
+Adjacency arrays are placed into shared memory once, and worker
+processes attach to them, so graph is not pickled to each worker.
+Each worker processes a range of nodes and returns an array of
+per-node values for this range.
+
+"""
+
+import contextlib
+from multiprocessing import Pool, shared_memory
+
+try:
+    import numpy as np
+except ImportError:
+    print('This script requires NumPy to be installed.')
+    exit(1)
+
+# number of node ranges per worker process,
+# more ranges give better load balancing
+CHUNKS_PER_JOB = 4
+
+# arrays, attached by worker process
+_shared = {}
+# shared memory blocks, which should stay opened in worker process
+_shared_blocks = []
+
+
+def op_degree(arrays, start, stop):
+    """Degree of nodes, self-loop is counted twice, like in NetworkX."""
+    indptr = arrays['indptr']
+    counts = indptr[start + 1:stop + 1] - indptr[start:stop]
+    rows = np.repeat(np.arange(start, stop), counts)
+    is_loop = arrays['indices'][indptr[start]:indptr[stop]] == rows
+    return counts + np.bincount(rows[is_loop] - start,
+                                minlength=stop - start)
+
+
+def op_selected_degree(arrays, start, stop):
+    """Number of edges of nodes to nodes, which are selected in
+    boolean array 'selected', self-loop is counted twice."""
+    indptr = arrays['indptr']
+    lo = indptr[start]
+    hi = indptr[stop]
+    neighbors = arrays['indices'][lo:hi]
+    is_selected = arrays['selected'][neighbors]
+
+    counts = np.zeros(hi - lo + 1, dtype=np.int64)
+    np.cumsum(is_selected, out=counts[1:])
+    degrees = (counts[indptr[start + 1:stop + 1] - lo] -
+               counts[indptr[start:stop] - lo])
+
+    rows = np.repeat(np.arange(start, stop),
+                     indptr[start + 1:stop + 1] - indptr[start:stop])
+    is_loop = is_selected & (neighbors == rows)
+    return degrees + np.bincount(rows[is_loop] - start,
+                                 minlength=stop - start)
+
+
+# per-node operations, available in worker processes
+OPERATIONS = {
+    'degree': op_degree,
+    'selected_degree': op_selected_degree,
+}
+
+
+def _attach(specs):
+    """Attach worker process to shared arrays."""
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        array.setflags(write=False)
+        _shared[name] = array
+        _shared_blocks.append(block)
+
+
+def _run(task):
+    """Apply operation to range of nodes in worker process."""
+    operation, start, stop, args = task
+    return start, operation(_shared, start, stop, *args)
+
+
+def split_nodes(indptr, num_chunks):
+    """Split nodes into ranges with roughly equal number of edges."""
+    num_nodes = len(indptr) - 1
+    bounds = np.searchsorted(indptr,
+                             np.linspace(0, indptr[-1], num_chunks + 1))
+    bounds[0] = 0
+    bounds[-1] = num_nodes
+    bounds = np.unique(bounds)
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+@contextlib.contextmanager
+def shared_pool(indptr, indices, jobs=1, extra=None):
+    """Yield function, which applies operation to each range of nodes
+    from list of pairs (start, stop) of CSR adjacency in jobs worker
+    processes and iterates over pairs (start, result) in order
+    of completion.
+
+    Arrays are placed into shared memory and worker processes are
+    started once, so the function can be called many times.
+
+    """
+    arrays = {'indptr': indptr, 'indices': indices}
+    if extra:
+        arrays.update(extra)
+
+    if jobs == 1:
+        # no need to organize pool
+        def _apply_local(operation, ranges, args=()):
+            if isinstance(operation, str):
+                operation = OPERATIONS[operation]
+            for start, stop in ranges:
+                yield start, operation(arrays, start, stop, *args)
+
+        yield _apply_local
+        return
+
+    blocks = []
+    specs = {}
+    try:
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True,
+                                               size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype,
+                       buffer=block.buf)[...] = array
+            specs[name] = (block.name, array.shape, array.dtype.str)
+
+        with Pool(processes=jobs, initializer=_attach,
+                  initargs=(specs,)) as pool:
+            def _apply(operation, ranges, args=()):
+                if isinstance(operation, str):
+                    operation = OPERATIONS[operation]
+                tasks = [(operation, start, stop, args)
+                         for start, stop in ranges]
+                return pool.imap_unordered(_run, tasks)
+
+            yield _apply
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def run_operation(operation, indptr, indices, jobs, extra, args):
+    """Iterate over pairs (start, result) of operation, applied to ranges
+    of nodes of CSR adjacency in jobs worker processes, in order of
+    completion."""
+    num_nodes = len(indptr) - 1
+    if jobs == 1 or num_nodes == 0:
+        ranges = [(0, num_nodes)]
+        jobs = 1
+    else:
+        ranges = split_nodes(indptr, jobs * CHUNKS_PER_JOB)
+
+    with shared_pool(indptr, indices, jobs, extra) as apply:
+        for chunk in apply(operation, ranges, args):
+            yield chunk
+
+
+def map_nodes(operation, indptr, indices, jobs=1, extra=None, args=()):
+    """Apply operation to all nodes of CSR adjacency.
+
+    Operation is a name from OPERATIONS or module-level function of
+    (arrays, start, stop, *args), which returns array of results for
+    nodes in range [start, stop). Use jobs worker processes, which share
+    indptr, indices and arrays from extra dict through shared memory.
+    Return array of per-node results.
+
+    """
+    chunks = sorted(run_operation(operation, indptr, indices,
+                                  jobs, extra, args),
+                    key=lambda chunk: chunk[0])
+    return np.concatenate([values for _, values in chunks])
+
+
+def sum_nodes(operation, indptr, indices, jobs=1, extra=None, args=()):
+    """Apply operation to all nodes of CSR adjacency and sum results.
+
+    The same, as map_nodes(), but operation returns array of results
+    for all nodes, which is computed from nodes in range [start, stop).
+
+    """
+    total = None
+    for _, values in run_operation(operation, indptr, indices,
+                                   jobs, extra, args):
+        total = values if total is None else total + values
+    return total
@@ -1,18 +1,28 @@
 """This module contains various predicate functions."""
 
+import graph.arrays as arrays
 
-def is_media_activist(node, avg_num_friends):
+# media-activist thresholds, relative to average number of friends
+HARD_LIMIT_FACTOR = 3
+SOFT_LIMIT_FACTOR = 2
+# followers to friends ratio, used together with soft limit
+SOFT_FF_RATIO = 5
+
+
+def is_media_activist(node, avg_num_friends,
+                      hard_limit_factor=HARD_LIMIT_FACTOR,
+                      soft_limit_factor=SOFT_LIMIT_FACTOR,
+                      soft_ff_ratio=SOFT_FF_RATIO):
     '''Check, if person is media-activist.
     Media-activist is a person, who:
     1. has number of friends more than 3 * average number of friends
     or
     2. has number of followers more than 3 * average number of friends
     or
-    3. has number of friends more than 2 * average number of friends and
-    number of his friends is more than 5 * number of his followers.'''
-    hard_limit = avg_num_friends * 3
-    soft_limit = avg_num_friends * 2
-    soft_ff_ratio = 5
+    3. has number of followers more than 2 * average number of friends and
+    number of his followers is more than 5 * number of his friends.'''
+    hard_limit = avg_num_friends * hard_limit_factor
+    soft_limit = avg_num_friends * soft_limit_factor
     # hard_ff_ratio = 10
 
     if 'friends_total' in node[1]:
@@ -33,3 +43,48 @@ def is_media_activist(node, avg_num_friends):
             #     return True
 
     return False
+
+
+def media_activists_mask(graph, nodes=None,
+                         hard_limit_factor=HARD_LIMIT_FACTOR,
+                         soft_limit_factor=SOFT_LIMIT_FACTOR,
+                         soft_ff_ratio=SOFT_FF_RATIO):
+    '''Return boolean NumPy array, which is True for media-activists
+    among nodes (all nodes of graph by default).
+
+    Apply the same rules, as is_media_activist(), with average number of
+    friends computed over the same nodes, to all nodes at once.'''
+    values, present = arrays.attribute_columns(
+        graph, ('friends_total', 'followers_total'), nodes)
+
+    return classify_media_activists(values['friends_total'],
+                                    present['friends_total'],
+                                    values['followers_total'],
+                                    present['followers_total'],
+                                    hard_limit_factor, soft_limit_factor,
+                                    soft_ff_ratio)
+
+
+def classify_media_activists(friends, has_friends, followers, has_followers,
+                             hard_limit_factor=HARD_LIMIT_FACTOR,
+                             soft_limit_factor=SOFT_LIMIT_FACTOR,
+                             soft_ff_ratio=SOFT_FF_RATIO):
+    '''Return boolean NumPy array, which is True for media-activists.
+
+    Take arrays of number of friends and followers per node, together
+    with boolean arrays, which are True, if node has this number.'''
+    num_with_friends = has_friends.sum()
+    if num_with_friends == 0:
+        avg_num_friends = 0
+    else:
+        avg_num_friends = friends[has_friends].sum() / num_with_friends
+
+    hard_limit = avg_num_friends * hard_limit_factor
+    soft_limit = avg_num_friends * soft_limit_factor
+
+    return has_friends & (
+        (friends > hard_limit) |
+        (has_followers & (
+            (followers > hard_limit) |
+            ((followers > soft_limit) &
+             (followers > friends * soft_ff_ratio)))))
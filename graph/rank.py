@@ -0,0 +1,83 @@
+"""PageRank of graph nodes, computed over CSR adjacency."""
+
+try:
+    import networkx as nx
+except ImportError:
+    print('This script requires NetworkX to be installed.')
+    exit(1)
+
+try:
+    import numpy as np
+except ImportError:
+    print('This script requires NumPy to be installed.')
+    exit(1)
+
+import graph.arrays as arrays
+
+DEFAULT_ALPHA = 0.85
+DEFAULT_TOL = 1.0e-6
+DEFAULT_MAX_ITER = 100
+
+
+def pagerank(graph, alpha=DEFAULT_ALPHA, tol=DEFAULT_TOL,
+             max_iter=DEFAULT_MAX_ITER, nstart=None, weight='weight'):
+    """Return dict with PageRank of each node of graph.
+
+    Use the same model, as networkx.pagerank(): each edge of undirected
+    graph is followed in both directions, rank of dangling nodes is
+    spread uniformly, iterations stop, when L1 change of ranks is less,
+    than number of nodes * tol. Edge is followed with probability
+    proportional to its attribute weight (1 by default), all edges
+    are equally likely, if weight is None.
+
+    nstart is a dict with initial ranks, for example, ranks of previous
+    snapshot of the same graph. Nodes, which are not in nstart, start
+    with average of initial ranks, so after small changes of graph power
+    iteration converges in a few steps. Iteration starts from uniform
+    ranks, if sum of initial ranks is not positive.
+
+    Raise NetworkXError, if power iteration does not converge
+    in max_iter iterations.
+
+    """
+    nodes = graph.nodes()
+    num_nodes = len(nodes)
+    if num_nodes == 0:
+        return {}
+
+    if weight is None:
+        indptr, indices = arrays.csr_adjacency(graph, nodes)
+        weights = np.ones(len(indices))
+    else:
+        indptr, indices, weights = arrays.weighted_csr_adjacency(
+            graph, nodes, weight)
+    # row of each element of indices
+    rows = np.repeat(np.arange(num_nodes), indptr[1:] - indptr[:-1])
+    # total weight of outgoing edges of each node
+    degrees = np.bincount(rows, weights=weights, minlength=num_nodes)
+    is_dangling = degrees <= 0
+    # avoid division by zero, dangling nodes have no outgoing edges
+    inv_degrees = 1.0 / np.where(is_dangling, 1.0, degrees)
+
+    x = None
+    if nstart is not None:
+        known = [nstart[node] for node in nodes if node in nstart]
+        default = sum(known) / len(known) if known else 1.0
+        x = np.array([nstart.get(node, default) for node in nodes],
+                     dtype=np.float64)
+        total = x.sum()
+        x = x / total if total > 0 else None
+    if x is None:
+        x = np.full(num_nodes, 1.0 / num_nodes)
+
+    for _ in range(max_iter):
+        x_last = x
+        spread = (x_last * inv_degrees)[indices] * weights
+        x = alpha * np.bincount(rows, weights=spread, minlength=num_nodes)
+        x += (alpha * x_last[is_dangling].sum() + 1.0 - alpha) / num_nodes
+
+        if np.abs(x - x_last).sum() < num_nodes * tol:
+            return dict(zip(nodes, x.tolist()))
+
+    raise nx.NetworkXError('pagerank: power iteration failed to converge '
+                           'in {} iterations.'.format(max_iter))
@@ -0,0 +1,169 @@
+"""Sampling of nodes of large graphs for previews.
+
+Each method selects given number of nodes from set of candidate nodes
+(the whole graph or nodes, which passed previous filters) and visits
+only sampled nodes and their neighbors, so, apart from listing
+of candidates, its time grows with size of sample, not with size
+of graph. Edges between sampled nodes are kept
+by caller, so sample is an induced subgraph.
+
+"""
+
+import collections
+import itertools
+import random
+
+# probability of jump back to start node of random walk
+WALK_RESTART = 0.15
+# random walk jumps to new start node, if it finds no new nodes
+# after this number of steps per sampled node
+WALK_MAX_STEPS = 100
+# forward burning probability of forest fire
+FIRE_FORWARD = 0.7
+# minimal number of edges, chosen at once by random edge sampling
+EDGE_BATCH = 100
+
+
+def _nodes(graph, candidates):
+    # order of graph nodes does not depend on order of set of candidates,
+    # so sampling with the same seed is reproducible
+    if len(candidates) == graph.number_of_nodes():
+        return graph.nodes()
+    return [node for node in graph.nodes_iter() if node in candidates]
+
+
+def _neighbors(graph, node, candidates):
+    return [neighbor for neighbor in graph.adj[node]
+            if neighbor in candidates and neighbor != node]
+
+
+def random_nodes(graph, candidates, size, rng):
+    """Return set of size nodes, chosen uniformly at random."""
+    return set(rng.sample(_nodes(graph, candidates), size))
+
+
+def random_edges(graph, candidates, size, rng):
+    """Return set of size nodes, which are endpoints of edges, chosen
+    uniformly at random.
+
+    Edge is chosen as a node, chosen with probability proportional to
+    its degree, and its random neighbor; edges to nodes, which are not
+    candidates, are rejected. If there are no edges between candidates,
+    remaining nodes are chosen uniformly at random.
+
+    """
+    nodes = _nodes(graph, candidates)
+    adjacency = graph.adj
+    cum_degrees = list(itertools.accumulate(
+        len(adjacency[node]) for node in nodes))
+    if not cum_degrees or cum_degrees[-1] == 0:
+        return random_nodes(graph, candidates, size, rng)
+
+    sample = set()
+    while len(sample) < size:
+        num_sampled = len(sample)
+        for node in rng.choices(nodes, cum_weights=cum_degrees,
+                                k=max(size - len(sample), EDGE_BATCH)):
+            neighbor = rng.choice(list(adjacency[node]))
+            if neighbor in candidates and neighbor != node:
+                sample.add(node)
+                if len(sample) < size:
+                    sample.add(neighbor)
+                if len(sample) == size:
+                    break
+
+        if len(sample) == num_sampled:
+            rest = [node for node in nodes if node not in sample]
+            sample.update(rng.sample(rest, size - len(sample)))
+    return sample
+
+
+def random_walk(graph, candidates, size, rng):
+    """Return set of size nodes, visited by random walk with restarts.
+
+    Walk jumps back to its start node with probability WALK_RESTART at
+    each step, and to new random start node, if it is stuck in small
+    component.
+
+    """
+    nodes = _nodes(graph, candidates)
+    # walk returns to the same nodes, so their neighbors are cached
+    neighbors = {}
+    sample = set()
+    while len(sample) < size:
+        start = node = rng.choice(nodes)
+        sample.add(start)
+        num_steps = 0
+        num_sampled = len(sample)
+        while len(sample) < size and num_steps < WALK_MAX_STEPS:
+            if node not in neighbors:
+                neighbors[node] = _neighbors(graph, node, candidates)
+            if not neighbors[node] or rng.random() < WALK_RESTART:
+                node = start
+            else:
+                node = rng.choice(neighbors[node])
+            sample.add(node)
+
+            if len(sample) > num_sampled:
+                num_sampled = len(sample)
+                num_steps = 0
+            else:
+                num_steps += 1
+    return sample
+
+
+def forest_fire(graph, candidates, size, rng):
+    """Return set of size nodes, burned by forest fire.
+
+    Fire starts at random node and spreads from each burning node to
+    geometrically distributed number of its unburned neighbors with
+    mean FIRE_FORWARD / (1 - FIRE_FORWARD). If fire dies out, it starts
+    again at new random node.
+
+    """
+    nodes = _nodes(graph, candidates)
+    sample = set()
+    while len(sample) < size:
+        start = rng.choice(nodes)
+        if start in sample:
+            continue
+        sample.add(start)
+        burning = collections.deque([start])
+        while burning and len(sample) < size:
+            node = burning.popleft()
+            num_burned = 0
+            while rng.random() < FIRE_FORWARD:
+                num_burned += 1
+
+            neighbors = [neighbor for neighbor
+                         in _neighbors(graph, node, candidates)
+                         if neighbor not in sample]
+            burned = rng.sample(neighbors, min(num_burned, len(neighbors),
+                                               size - len(sample)))
+            sample.update(burned)
+            burning.extend(burned)
+    return sample
+
+
+# sampling methods by name
+methods = {
+    'node': random_nodes,
+    'edge': random_edges,
+    'walk': random_walk,
+    'fire': forest_fire,
+}
+
+
+def sample(graph, candidates, size, method='node', rng=None):
+    """Return set of size nodes from set of candidates, chosen by
+    method from methods, or all candidates, if there are not more
+    of them, than size.
+
+    rng is random.Random instance, used for reproducible sampling.
+
+    """
+    if len(candidates) <= size:
+        return set(candidates)
+    if rng is None:
+        rng = random.Random()
+    return methods[method](graph, candidates, size, rng)
@@ -1,31 +1,116 @@
 """Graph-related statistical functions"""
 
+try:
+    import numpy as np
+except ImportError:
+    print('This script requires NumPy to be installed.')
+    exit(1)
+
+# numeric node values, which are summarized
+SUMMARY_VALUES = ('degree', 'friends_total', 'followers_total')
+SUMMARY_PERCENTILES = (10, 25, 75, 90, 99)
+# values of 'sex' attribute of vk.com users
+SEXES = {1: 'female', 2: 'male'}
+
 
 def avg_num_friends(graph):
     """Average number of friends in graph."""
-    num_nodes = 0
-    num_friends = 0
-    for node in graph.nodes(data=True):
-        if 'friends_total' in node[1]:
-            num_friends += node[1]['friends_total']
-            num_nodes += 1
-
-    if num_nodes == 0:
-        return 0
-    else:
-        return num_friends / num_nodes
+    return _avg_attribute(graph, 'friends_total')
 
 
 def avg_num_followers(graph):
     """Average number of followers in graph."""
-    num_nodes = 0
-    num_followers = 0
-    for node in graph.nodes(data=True):
-        if 'followers_total' in node[1]:
-            num_followers += node[1]['followers_total']
-            num_nodes += 1
-
-    if num_nodes == 0:
+    return _avg_attribute(graph, 'followers_total')
+
+
+def _avg_attribute(graph, attr):
+    values = [data[attr] for data in graph.node.values() if attr in data]
+    if not values:
         return 0
-    else:
-        return num_followers / num_nodes
+    return sum(values) / len(values)
+
+
+def node_columns(graph):
+    """Collect degree, numbers of friends and followers and sex of nodes
+    into arrays in one pass over graph.
+
+    Return tuple (values, present) of dicts, like
+    arrays.attribute_columns, with all nodes present in 'degree'.
+    Self-loop is counted twice in degree, like in NetworkX. Nodes
+    without 'sex' attribute have sex 0 (not specified).
+
+    """
+    num_nodes = graph.number_of_nodes()
+    values = {name: np.zeros(num_nodes, dtype=np.int64)
+              for name in SUMMARY_VALUES + ('sex',)}
+    present = {name: np.zeros(num_nodes, dtype=bool)
+               for name in SUMMARY_VALUES}
+    present['degree'][:] = True
+
+    adjacency = graph.adj
+    for i, (node, data) in enumerate(graph.node.items()):
+        neighbors = adjacency[node]
+        values['degree'][i] = len(neighbors) + (node in neighbors)
+        for attr in ('friends_total', 'followers_total'):
+            if attr in data:
+                values[attr][i] = data[attr]
+                present[attr][i] = True
+        values['sex'][i] = data.get('sex', 0)
+
+    return values, present
+
+
+def log_histogram(values):
+    """Return histogram of non-negative integer values with bins
+    [0, 0], [1, 1], [2, 3], [4, 7], ..., as list of tuples
+    (lower bound, upper bound, count)."""
+    if len(values) == 0:
+        return []
+    # number of bin is number of binary digits of value
+    bins = np.zeros(len(values), dtype=np.int64)
+    positive = values > 0
+    bins[positive] = np.floor(np.log2(values[positive])).astype(np.int64) + 1
+    counts = np.bincount(bins)
+    return [(0 if i == 0 else 2 ** (i - 1), 0 if i == 0 else 2 ** i - 1,
+             int(count))
+            for i, count in enumerate(counts)]
+
+
+def describe(values):
+    """Return dict with count, mean, median, minimum, maximum,
+    percentiles and histogram of array of values."""
+    if len(values) == 0:
+        return {'count': 0}
+
+    percentiles = np.percentile(values, (50,) + SUMMARY_PERCENTILES)
+    return {
+        'count': len(values),
+        'mean': float(values.mean()),
+        'median': float(percentiles[0]),
+        'min': int(values.min()),
+        'max': int(values.max()),
+        'percentiles': {p: float(value) for p, value
+                        in zip(SUMMARY_PERCENTILES, percentiles[1:])},
+        'histogram': log_histogram(values),
+    }
+
+
+def summary(graph):
+    """Return dict with numbers of nodes and edges, description of
+    degree, numbers of friends and followers of nodes (see describe)
+    and number of nodes of each sex, computed in one pass over graph."""
+    values, present = node_columns(graph)
+
+    sexes = np.bincount(values['sex'][values['sex'] >= 0],
+                        minlength=max(SEXES) + 1)
+    sex_counts = {name: int(sexes[sex]) for sex, name in SEXES.items()}
+    sex_counts['unknown'] = graph.number_of_nodes() - sum(sex_counts.values())
+
+    result = {
+        'num_nodes': graph.number_of_nodes(),
+        'num_edges': graph.number_of_edges(),
+        'sex': sex_counts,
+    }
+    for name in SUMMARY_VALUES:
+        result[name] = describe(values[name][present[name]])
+    return result
@@ -0,0 +1,227 @@
+"""Streaming filters for graphs, stored in edge list format.
+
+Graph is stored as edge list file, which contains one edge per line
+in form 'UID UID' or 'UID UID WEIGHT', and optional node table file
+next to it (with the same name and '.nodes' extension), which contains
+tab-separated node attributes with header line. Filters are applied
+in a fixed number of passes over these files, and keep in memory only
+per-node data.
+
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    print('This script requires NumPy to be installed.')
+    exit(1)
+
+import graph.predicates as predicates
+
+NODE_TABLE_EXT = '.nodes'
+# attributes of node table, which values are converted to numbers,
+# other values (like names) are kept as strings
+NUMERIC_ATTRS = ('sex', 'friends_total', 'followers_total', 'community')
+
+
+def node_table_path(filename):
+    """Return path to node table of graph in edge list file."""
+    if filename.endswith('.edgelist'):
+        filename = filename[:-len('.edgelist')]
+    return filename + NODE_TABLE_EXT
+
+
+def parse_node(value):
+    """Convert node identifier from file to UID, if possible."""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def parse_value(value):
+    """Convert numeric value from file to number, if possible."""
+    for value_type in (int, float):
+        try:
+            return value_type(value)
+        except ValueError:
+            pass
+    return value
+
+
+def format_value(value):
+    """Convert attribute value to node table field."""
+    return str(value).replace('\t', ' ').replace('\n', ' ')
+
+
+def read_edges(filename):
+    """Iterate over edges (UID, UID, attributes) in edge list file.
+
+    Attributes contain weight of edge, if it is specified.
+
+    """
+    with open(filename, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = line.split()
+            data = {}
+            if len(fields) > 2:
+                data['weight'] = parse_value(fields[2])
+            yield parse_node(fields[0]), parse_node(fields[1]), data
+
+
+def read_edge_array(filename):
+    """Return array of shape (m, 2) with integer UIDs of edges in edge
+    list file, parsed without creating Python objects per edge.
+
+    Raise ValueError, if nodes are not integer UIDs.
+
+    """
+    return np.loadtxt(filename, dtype=np.int64, comments='#',
+                      usecols=(0, 1), ndmin=2)
+
+
+def format_edge(u, v, data):
+    """Convert edge to line of edge list file."""
+    if 'weight' in data:
+        return '{} {} {}\n'.format(u, v, data['weight'])
+    return '{} {}\n'.format(u, v)
+
+
+def parse_node_data(header, fields):
+    """Return dict with attributes from fields of row of node table
+    with specified header, values of NUMERIC_ATTRS are numbers."""
+    return {attr: parse_value(value) if attr in NUMERIC_ATTRS else value
+            for attr, value in zip(header[1:], fields[1:]) if value != ''}
+
+
+def read_node_table(filename):
+    """Iterate over pairs (UID, attributes) in node table file."""
+    with open(filename, 'r') as f:
+        header = f.readline().rstrip('\n').split('\t')
+        for line in f:
+            fields = line.rstrip('\n').split('\t')
+            yield parse_node(fields[0]), parse_node_data(header, fields)
+
+
+def write_node_table(nodes, filename):
+    """Write pairs (UID, attributes) to node table file.
+
+    Skip attributes with complex values, like lists or dicts.
+
+    """
+    nodes = list(nodes)
+    attrs = []
+    for _, data in nodes:
+        for attr, value in data.items():
+            if attr not in attrs and type(value) not in (list, dict):
+                attrs.append(attr)
+
+    with open(filename, 'w') as f:
+        f.write('\t'.join(['uid'] + attrs) + '\n')
+        for node, data in nodes:
+            fields = [format_value(node)]
+            for attr in attrs:
+                fields.append(format_value(data[attr])
+                              if attr in data else '')
+            f.write('\t'.join(fields) + '\n')
+
+
+def media_activists(filename):
+    """Return set of UIDs of media-activists from node table file."""
+    uids = []
+    columns = {'friends_total': [], 'followers_total': []}
+    for node, data in read_node_table(filename):
+        uids.append(node)
+        for attr in columns:
+            columns[attr].append(data.get(attr, -1))
+
+    friends = np.array(columns['friends_total'], dtype=np.float64)
+    followers = np.array(columns['followers_total'], dtype=np.float64)
+    mask = predicates.classify_media_activists(friends, friends >= 0,
+                                               followers, followers >= 0)
+    return {uids[i] for i in mask.nonzero()[0]}
+
+
+def count_degrees(filename, is_selected):
+    """Count number of edges to selected nodes per selected node
+    in one pass over edge list file."""
+    degrees = {}
+    for u, v, _ in read_edges(filename):
+        if is_selected(u) and is_selected(v):
+            # self-loop is counted twice, like in graph.degree
+            degrees[u] = degrees.get(u, 0) + 1
+            degrees[v] = degrees.get(v, 0) + 1
+    return degrees
+
+
+def copy_node_table(src, dst, is_selected):
+    """Copy rows of selected nodes from node table src to dst."""
+    with open(src, 'r') as f_src, open(dst, 'w') as f_dst:
+        f_dst.write(f_src.readline())
+        for line in f_src:
+            if is_selected(parse_node(line.split('\t', 1)[0].strip())):
+                f_dst.write(line)
+
+
+def filter_graph(src, dst, exclude_media_activists=False, uids=None,
+                 trims=()):
+    """Filter graph in edge list file src and write result to dst.
+
+    Filters are applied in the same order, as in process.py: exclusion
+    of media-activists, filtering by uids, and then trims with each
+    minimal number of connected edges from trims. Node table of src is
+    used and filtered too, if it exists. Each trim costs one pass over
+    edge list, result is written in one more pass.
+
+    Return number of written edges.
+
+    """
+    src_nodes = node_table_path(src)
+    try:
+        open(src_nodes).close()
+    except FileNotFoundError:
+        src_nodes = None
+
+    # nodes, which passed all previous filters, None means all nodes
+    selected = None
+    # nodes, which are excluded explicitly
+    excluded = set()
+
+    def _is_selected(node):
+        return ((selected is None or node in selected) and
+                node not in excluded)
+
+    if exclude_media_activists:
+        if src_nodes is None:
+            print('E: cannot exclude media-activists without '
+                  'node table {}.'.format(node_table_path(src)))
+            raise IOError
+        print('Exclude media-activists...')
+        excluded = media_activists(src_nodes)
+
+    if uids is not None:
+        print('Filter by uids: {}'.format(uids))
+        selected = set(uids) - excluded
+
+    for min_num_nodes in trims:
+        print('Trim nodes with less than {0} '
+              'connected edges...'.format(min_num_nodes))
+        degrees = count_degrees(src, _is_selected)
+        selected = {node for node, degree in degrees.items()
+                    if degree >= min_num_nodes}
+        excluded = set()
+
+    print('Write filtered graph to: {0}.'.format(dst))
+    num_edges = 0
+    with open(dst, 'w') as f:
+        for u, v, data in read_edges(src):
+            if _is_selected(u) and _is_selected(v):
+                f.write(format_edge(u, v, data))
+                num_edges += 1
+
+    if src_nodes is not None:
+        copy_node_table(src_nodes, node_table_path(dst), _is_selected)
+
+    return num_edges
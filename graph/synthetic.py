@@ -0,0 +1,99 @@
+"""Synthetic graphs, similar to graphs of vk.com users.
+
+Topology is generated by Chung-Lu model with power-law expected
+degrees, so degree distribution is scale-free, like in real friendship
+graphs. Node attributes are the same, as get.py requests: first and
+last names, sex, total numbers of friends and followers.
+
+"""
+
+try:
+    import networkx as nx
+except ImportError:
+    print('This script requires NetworkX to be installed.')
+    exit(1)
+
+try:
+    import numpy as np
+except ImportError:
+    print('This script requires NumPy to be installed.')
+    exit(1)
+
+DEFAULT_AVG_DEGREE = 10
+# exponent of power-law degree distribution
+DEFAULT_EXPONENT = 2.5
+# fraction of nodes without known number of followers
+MISSING_FOLLOWERS = 0.1
+
+FIRST_NAMES = ['Ivan', 'Petr', 'Sergey', 'Anna', 'Maria', 'Olga',
+               'Alexey', 'Dmitry', 'Elena', 'Natalia', 'Pavel', 'Irina']
+LAST_NAMES = ['Ivanov', 'Petrov', 'Sidorov', 'Smirnov', 'Kuznetsov',
+              'Popov', 'Volkov', 'Novikov', 'Morozov', 'Lebedev']
+
+
+def scale_free_edges(num_nodes, avg_degree=DEFAULT_AVG_DEGREE,
+                     exponent=DEFAULT_EXPONENT, rng=None):
+    """Return array of shape (m, 2) with unique edges of connected
+    random graph with power-law expected degrees and without self-loops.
+
+    Graph is connected by random tree, like graphs, which are crawled
+    from one user.
+
+    """
+    if rng is None:
+        rng = np.random.RandomState()
+
+    # expected degrees of nodes: w_i ~ (i + 1)^(-1 / (exponent - 1))
+    weights = np.arange(1, num_nodes + 1, dtype=np.float64) ** (
+        -1.0 / (exponent - 1))
+    weights /= weights.sum()
+
+    # random tree: each node is connected to one of previous nodes
+    tree_u = np.arange(1, num_nodes)
+    tree_v = (rng.random_sample(num_nodes - 1) * tree_u).astype(np.int64)
+
+    num_edges = max(num_nodes * avg_degree // 2 - (num_nodes - 1), 0)
+    u = np.concatenate((tree_u, rng.choice(num_nodes, size=num_edges,
+                                           p=weights)))
+    v = np.concatenate((tree_v, rng.choice(num_nodes, size=num_edges,
+                                           p=weights)))
+    # hubs get random UIDs instead of the first ones
+    permutation = rng.permutation(num_nodes)
+    u = permutation[u]
+    v = permutation[v]
+
+    is_edge = u != v
+    keys = np.unique(np.minimum(u, v)[is_edge] * num_nodes +
+                     np.maximum(u, v)[is_edge])
+    return np.column_stack((keys // num_nodes, keys % num_nodes))
+
+
+def vk_graph(num_nodes, avg_degree=DEFAULT_AVG_DEGREE,
+             exponent=DEFAULT_EXPONENT, seed=None):
+    """Return random NetworkX graph with num_nodes nodes, scale-free
+    topology and attributes of vk.com users."""
+    rng = np.random.RandomState(seed)
+    edges = scale_free_edges(num_nodes, avg_degree, exponent, rng)
+
+    degrees = np.bincount(edges.ravel(), minlength=num_nodes)
+    # users have friends outside of graph
+    friends = degrees + rng.lognormal(3, 1.5, num_nodes).astype(np.int64)
+    followers = rng.lognormal(2, 1.5, num_nodes).astype(np.int64)
+    has_followers = rng.random_sample(num_nodes) >= MISSING_FOLLOWERS
+    first_names = rng.randint(0, len(FIRST_NAMES), num_nodes)
+    last_names = rng.randint(0, len(LAST_NAMES), num_nodes)
+    sexes = rng.randint(0, 3, num_nodes)
+
+    graph = nx.Graph()
+    for uid in range(num_nodes):
+        data = {
+            'first_name': FIRST_NAMES[first_names[uid]],
+            'last_name': LAST_NAMES[last_names[uid]],
+            'sex': int(sexes[uid]),
+            'friends_total': int(friends[uid]),
+        }
+        if has_followers[uid]:
+            data['followers_total'] = int(followers[uid])
+        graph.add_node(uid, data)
+    graph.add_edges_from(edges.tolist())
+    return graph
@@ -2,18 +2,15 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import pickle
+import sys
 import time
 
-try:
-    import networkx as nx
-except ImportError:
-    print('This script requires NetworkX library to be installed.')
-    exit(1)
-
-import graph.io as io
-import graph.stats as stats
-import graph.predicates as predicates
+# NetworkX, NumPy and graph modules are imported only by characteristics,
+# which use them, so parsing of arguments and cheap characteristics
+# do not wait for them
 
+import utils.memory as gmemory
 import utils.print as gprint
 
 
@@ -21,295 +18,701 @@ def gen_username(first_name, last_name, uid):
     return '{} {} ({})'.format(first_name, last_name, uid)
 
 
-def add_rows(table_data, table):
-    for username in table_data:
-        table_data[username].insert(0, username)
-        table.add_row(table_data[username])
+# computed metrics, keyed by id of graph and name of metric with options
+_metrics = {}
+# persistent caches of metrics, keyed by id of graph
+_caches = {}
+
+
+def use_cache(graph, filename):
+    """Read metrics of graph from cache of its file filename, when they
+    are needed first, and write new ones there with store_cache()."""
+    import graph.cache as cache
+
+    _caches[id(graph)] = {'path': cache.cache_path(filename),
+                          'key': cache.file_key(filename),
+                          'metrics': None}
+
+
+def cached_metrics(graph):
+    """Return dict with cached metrics of graph, loading it on first
+    call, empty dict if graph has no cache."""
+    import graph.cache as cache
+
+    graph_cache = _caches.get(id(graph))
+    if graph_cache is None:
+        return {}
+    if graph_cache['metrics'] is None:
+        graph_cache['metrics'] = cache.load_metrics(graph_cache['path'],
+                                                    graph_cache['key'])
+    return graph_cache['metrics']
+
+
+def store_cache(graph):
+    """Write new computed metrics of graph to its cache."""
+    import graph.cache as cache
+
+    graph_cache = _caches.get(id(graph))
+    if graph_cache is None or graph_cache['metrics'] is None:
+        # no cacheable metrics were requested
+        return
+    metrics = dict(graph_cache['metrics'])
+    metrics.update((key, value) for (graph_id, key), value
+                   in _metrics.items() if graph_id == id(graph))
+    if metrics.keys() != graph_cache['metrics'].keys():
+        cache.store_metrics(graph_cache['path'], graph_cache['key'],
+                            metrics)
+
+
+def metric(graph, key, compute):
+    """Return metric of graph, identified by key, computing it only once
+    for all characteristics, which depend on it."""
+    if (id(graph), key) not in _metrics:
+        cached = cached_metrics(graph)
+        _metrics[(id(graph), key)] = cached[key] if key in cached \
+            else compute()
+    return _metrics[(id(graph), key)]
+
+
+def eccentricity_bounds(graph, max_bfs=None, jobs=1):
+    """Return tuple (nodes, lower, upper) with bounds of eccentricities
+    of nodes."""
+    import graph.distance as distance
+
+    def _compute():
+        nodes = graph.nodes()
+        lower, upper = distance.eccentricity_bounds(graph, nodes, max_bfs,
+                                                    jobs)
+        return nodes, lower, upper
+
+    # limited number of BFS runs gives bounds, which depend on number
+    # of sources per round
+    key = ('eccentricity_bounds', max_bfs) if max_bfs is None \
+        else ('eccentricity_bounds', max_bfs, jobs)
+    return metric(graph, key, _compute)
+
+
+def format_bounds(lower, upper):
+    """Format exact value or range of possible values."""
+    if lower == upper:
+        return str(lower)
+    return 'from {} to {}'.format(lower, upper)
+
+
+def format_summary(summary):
+    """Format summary of graph from stats.summary as text report."""
+    import graph.stats as stats
+    import utils.table as gtable
+
+    lines = ['Number of nodes: {num_nodes}'.format(**summary),
+             'Number of edges: {num_edges}'.format(**summary),
+             'Sex: ' + ', '.join('{} {}'.format(name, count) for name, count
+                                 in sorted(summary['sex'].items()))]
+
+    names = [name for name in stats.SUMMARY_VALUES
+             if summary[name]['count'] > 0]
+
+    # columns of table: percentiles around median, like in box plot
+    headers = ['Value', 'Count', 'Mean', 'Min']
+    columns = [names.__getitem__]
+    for key in ('count', 'mean', 'min'):
+        columns.append(lambda row, key=key: summary[names[row]][key])
+    for p in stats.SUMMARY_PERCENTILES:
+        if p > 50 and 'Median' not in headers:
+            headers.append('Median')
+            columns.append(lambda row: summary[names[row]]['median'])
+        headers.append('P{}'.format(p))
+        columns.append(
+            lambda row, p=p: summary[names[row]]['percentiles'][p])
+    headers.append('Max')
+    columns.append(lambda row: summary[names[row]]['max'])
+
+    aligns = ['l'] + ['r'] * (len(headers) - 1)
+    lines.append(gtable.format_table(headers, aligns, columns,
+                                     range(len(names)), '.2'))
+
+    for name in names:
+        lines.append('Histogram of {}:'.format(name))
+        for lower, upper, count in summary[name]['histogram']:
+            bounds = str(lower) if lower == upper \
+                else '{}-{}'.format(lower, upper)
+            lines.append('  {:>15}: {}'.format(bounds, count))
+    return '\n'.join(lines)
+
+
+def triangles(graph, jobs=1):
+    """Return tuple (nodes, number of triangles of each node)."""
+    import graph.clustering as clustering
+
+    def _compute():
+        nodes = graph.nodes()
+        return nodes, clustering.triangles(graph, nodes, jobs)
+
+    return metric(graph, ('triangles',), _compute)
+
+
+def avg_clustering(graph, jobs=1):
+    """Average clustering coefficient of graph."""
+    import graph.clustering as clustering
+
+    nodes, node_triangles = triangles(graph, jobs)
+    if len(nodes) == 0:
+        return 0
+    degrees = clustering.num_neighbors(graph, nodes)
+    return clustering.clustering(degrees, node_triangles).mean()
+
+
+def communities(graph, seed=None):
+    """Return tuple (nodes, community of each node, modularity)."""
+    import graph.community as community
+
+    def _compute():
+        nodes = graph.nodes()
+        labels, modularity = community.communities(graph, nodes, seed=seed)
+        return nodes, labels, modularity
+
+    return metric(graph, ('communities', seed), _compute)
+
+
+def marked_column(nodes, certain, possible):
+    """Return column with 'True' for certain nodes, '?' for possible
+    nodes and empty string for others."""
+    index = {node: i for i, node in enumerate(nodes)}
+    column = [''] * len(nodes)
+    for uids, mark in ((possible, '?'), (certain, 'True')):
+        for uid in uids:
+            column[index[uid]] = mark
+    return column
+
+
+def central_column(graph, nodes, max_bfs=None, jobs=1):
+    """Column, which marks central nodes."""
+    import graph.distance as distance
+
+    certain, possible = distance.center_bounds(
+        *eccentricity_bounds(graph, max_bfs, jobs))
+    return marked_column(nodes, certain, possible)
+
+
+def periphery_column(graph, nodes, max_bfs=None, jobs=1):
+    """Column, which marks periphery nodes."""
+    import graph.distance as distance
+
+    certain, possible = distance.periphery_bounds(
+        *eccentricity_bounds(graph, max_bfs, jobs))
+    return marked_column(nodes, certain, possible)
+
+
+def degree_column(graph, nodes, jobs=1):
+    """Column with degree of each node."""
+    import numpy as np
+    import graph.arrays as arrays
+    import graph.parallel as parallel
+
+    if jobs == 1:
+        return np.array([graph.degree(node) for node in nodes],
+                        dtype=np.int64)
+
+    indptr, indices = arrays.csr_adjacency(graph, nodes)
+    return parallel.map_nodes('degree', indptr, indices, jobs=jobs)
+
+
+def degree_cell(graph, node):
+    """Degree of node."""
+    return graph.degree(node)
+
+
+def num_friends_cell(graph, node):
+    """Total number of friends of node, 0 if it is unknown."""
+    return graph.node[node].get('friends_total', 0)
+
+
+def num_followers_cell(graph, node):
+    """Total number of followers of node, 0 if it is unknown."""
+    return graph.node[node].get('followers_total', 0)
+
+
+def num_friends_column(graph, nodes):
+    """Column with total number of friends of each node,
+    0 if it is unknown."""
+    import numpy as np
+    import graph.arrays as arrays
 
-
-def top_of_table(table_str, num_newlines):
-    first_index = table_str.find('\n')
-    first_line = table_str[:first_index + 1]
-
-    cur_index = 0
-    for _ in range(num_newlines + 3):
-        cur_index = table_str.find('\n', cur_index + 1)
-
-        # end of table
-        if cur_index == -1:
-            return table_str
-
-    return table_str[:cur_index + 1] + first_line
+    values, _ = arrays.attribute_columns(graph, ('friends_total',), nodes,
+                                         dtype=np.int64)
+    return values['friends_total']
 
 
-def append_central_nodes(graph, table_data):
-    """Append periphery nodes to table_data."""
-
-    # first, setup all values to false
-    for node in graph.nodes(data=True):
-        node_name = gen_username(node[1]['first_name'],
-                                 node[1]['last_name'],
-                                 node[0])
-        if node_name in table_data:
-            table_data[node_name].append('')
-        else:
-            table_data[node_name] = ['']
-
-    # second, update these values to True for periphery
-    for uid in nx.center(graph):
-        node_name = gen_username(graph.node[uid]['first_name'],
-                                 graph.node[uid]['last_name'],
-                                 uid)
-        table_data[node_name][-1] = 'True'
-
-
-def append_periphery_nodes(graph, table_data):
-    """Append periphery nodes to table_data."""
-
-    # first, setup all values to false
-    for node in graph.nodes(data=True):
-        node_name = gen_username(node[1]['first_name'],
-                                 node[1]['last_name'],
-                                 node[0])
-        if node_name in table_data:
-            table_data[node_name].append('')
-        else:
-            table_data[node_name] = ['']
-
-    # second, update these values to True for periphery
-    for uid in nx.periphery(graph):
-        node_name = gen_username(graph.node[uid]['first_name'],
-                                 graph.node[uid]['last_name'],
-                                 uid)
-        table_data[node_name][-1] = 'True'
-
-
-def append_degree(graph, table_data):
-    """Append degree of each node to table_data."""
-
-    for node in graph.nodes(data=True):
-        node_name = gen_username(node[1]['first_name'],
-                                 node[1]['last_name'],
-                                 node[0])
-        node_degree = graph.degree(node[0])
-        if node_name in table_data:
-            table_data[node_name].append(node_degree)
-        else:
-            table_data[node_name] = [node_degree]
-
-
-def append_num_friends(graph, table_data):
-    """Append number of friends (and followers, if exists) of each node to
-    table_data."""
-
-    # collect nodes only with 'friends_total'
-    for node in graph.nodes(data=True):
-        node_name = gen_username(node[1]['first_name'],
-                                 node[1]['last_name'],
-                                 node[0])
-
-        if 'friends_total' in node[1]:
-            num_friends = node[1]['friends_total']
-        else:
-            num_friends = 0
-
-        if node_name in table_data:
-            table_data[node_name].append(num_friends)
-        else:
-            table_data[node_name] = [num_friends]
-
-
-def append_num_followers(graph, table_data):
-    """Append number of friends (and followers, if exists) of each node to
-    table_data."""
-
-    # collect nodes only with 'friends_total'
-    for node in graph.nodes(data=True):
-        node_name = gen_username(node[1]['first_name'],
-                                 node[1]['last_name'],
-                                 node[0])
-
-        if 'followers_total' in node[1]:
-            num_friends = node[1]['followers_total']
-        else:
-            num_friends = 0
-
-        if node_name in table_data:
-            table_data[node_name].append(num_friends)
-        else:
-            table_data[node_name] = [num_friends]
-
-
-def append_pagerank(graph, table_data):
-    pageranks = nx.pagerank(graph).items()
-    for uid, pagerank in pageranks:
-        node_name = gen_username(graph.node[uid]['first_name'],
-                                 graph.node[uid]['last_name'],
-                                 uid)
-        if node_name in table_data:
-            table_data[node_name].append(pagerank)
-        else:
-            table_data[node_name] = [pagerank]
-
-
-def append_media_activist(graph, table_data):
-    '''Append information about "media-activism".'''
-    avg_friends = stats.avg_num_friends(graph)
-
-    # first, setup all values to false
-    for node in graph.nodes(data=True):
-        node_name = gen_username(node[1]['first_name'],
-                                 node[1]['last_name'],
-                                 node[0])
-        is_activist = ''
-        if predicates.is_media_activist(node, avg_friends):
-            is_activist = 'True'
-
-        if node_name in table_data:
-            table_data[node_name].append(is_activist)
-        else:
-            table_data[node_name] = [is_activist]
+def num_followers_column(graph, nodes):
+    """Column with total number of followers of each node,
+    0 if it is unknown."""
+    import numpy as np
+    import graph.arrays as arrays
+
+    values, _ = arrays.attribute_columns(graph, ('followers_total',), nodes,
+                                         dtype=np.int64)
+    return values['followers_total']
+
+
+def pagerank_column(graph, nodes, pagerank_alpha=None, pagerank_tol=None,
+                    pagerank_max_iter=None, pagerank_start=None,
+                    pagerank_save=None):
+    """Column with PageRank of each node.
+
+    Unspecified parameters of power iteration get default values from
+    graph.rank. Start power iteration from ranks, stored in file
+    pagerank_start, and store computed ranks to file pagerank_save,
+    if specified."""
+    import numpy as np
+    import graph.cache as cache
+    import graph.rank as rank
+
+    if pagerank_alpha is None:
+        pagerank_alpha = rank.DEFAULT_ALPHA
+    if pagerank_tol is None:
+        pagerank_tol = rank.DEFAULT_TOL
+    if pagerank_max_iter is None:
+        pagerank_max_iter = rank.DEFAULT_MAX_ITER
+
+    nstart = None
+    start_key = None
+    if pagerank_start:
+        with open(pagerank_start, 'rb') as f:
+            nstart = pickle.load(f)
+        start_key = cache.file_key(pagerank_start)
+
+    pageranks = metric(graph, ('pagerank', pagerank_alpha, pagerank_tol,
+                               pagerank_max_iter, start_key),
+                       lambda: rank.pagerank(graph, alpha=pagerank_alpha,
+                                             tol=pagerank_tol,
+                                             max_iter=pagerank_max_iter,
+                                             nstart=nstart))
+
+    if pagerank_save:
+        with open(pagerank_save, 'wb') as f:
+            pickle.dump(pageranks, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    return np.array([pageranks[node] for node in nodes], dtype=np.float64)
+
+
+def triangles_column(graph, nodes, jobs=1):
+    """Column with number of triangles of each node."""
+    all_nodes, node_triangles = triangles(graph, jobs)
+    index = {node: i for i, node in enumerate(all_nodes)}
+    return node_triangles[[index[node] for node in nodes]]
+
+
+def clustering_column(graph, nodes, jobs=1):
+    """Column with clustering coefficient of each node."""
+    import graph.clustering as clustering
+
+    degrees = clustering.num_neighbors(graph, nodes)
+    return clustering.clustering(degrees,
+                                 triangles_column(graph, nodes, jobs))
+
+
+def community_column(graph, nodes, community_seed=None):
+    """Column with number of community of each node,
+    0 is the largest community."""
+    all_nodes, labels, _ = communities(graph, community_seed)
+    index = {node: i for i, node in enumerate(all_nodes)}
+    return labels[[index[node] for node in nodes]]
+
+
+def media_activist_column(graph, nodes):
+    '''Column with information about "media-activism".'''
+    import graph.predicates as predicates
+
+    mask = predicates.media_activists_mask(graph, nodes)
+    return ['True' if is_activist else '' for is_activist in mask.tolist()]
+
 
 # list of implemented fields
 impl_fields = [
     {
         'header': 'degree',
-        'function': append_degree,
-        'align': 'r'
+        'function': degree_column,
+        'cell': degree_cell,
+        'align': 'r',
+        'options': ['jobs']
     },
     {
         'header': 'friends',
-        'function': append_num_friends,
+        'function': num_friends_column,
+        'cell': num_friends_cell,
         'align': 'r'
     },
     {
         'header': 'followers',
-        'function': append_num_followers,
+        'function': num_followers_column,
+        'cell': num_followers_cell,
         'align': 'r'
     },
     {
         'header': 'pagerank',
-        'function': append_pagerank,
-        'align': 'r'
+        'function': pagerank_column,
+        'align': 'r',
+        'options': ['pagerank_alpha', 'pagerank_tol', 'pagerank_max_iter',
+                    'pagerank_start', 'pagerank_save']
+    },
+    {
+        'header': 'triangles',
+        'function': triangles_column,
+        'align': 'r',
+        'options': ['jobs']
+    },
+    {
+        'header': 'clustering',
+        'function': clustering_column,
+        'align': 'r',
+        'options': ['jobs']
+    },
+    {
+        'header': 'community',
+        'function': community_column,
+        'align': 'r',
+        'options': ['community_seed']
     },
     {
         'header': 'central',
-        'function': append_central_nodes,
-        'align': 'c'
+        'function': central_column,
+        'align': 'c',
+        'options': ['max_bfs', 'jobs']
     },
     {
         'header': 'periphery',
-        'function': append_periphery_nodes,
-        'align': 'c'
+        'function': periphery_column,
+        'align': 'c',
+        'options': ['max_bfs', 'jobs']
     },
     {
         'header': 'media-activist',
-        'function': append_media_activist,
+        'function': media_activist_column,
         'align': 'c'
     },
 ]
 
-DESCRIPTION = 'Print characteristics of specified NetworkX graph'
 
-parser = argparse.ArgumentParser(description=DESCRIPTION)
-parser.add_argument('path', metavar='PATH', type=str,
-                    help='path to YAML file which contains graph data')
-parser.add_argument('-i', '--info',
-                    help='print general information about graph',
-                    action='store_true')
-parser.add_argument('-r', '--radius', help='print graph radius',
-                    action='store_true')
-parser.add_argument('-d', '--diameter', help='print graph diameter',
-                    action='store_true')
-
-parser.add_argument('--avg-friends', help='print average number of friends',
-                    action='store_true')
-parser.add_argument('--avg-followers', action='store_true',
-                    help='print average number of followers')
-
-impl_headers = ','.join([field['header'] for field in impl_fields])
-parser.add_argument('-f', '--fields', metavar='FIELDS', type=str,
-                    help='print specified fields of each node:\n'
-                    '{}'.format(impl_headers))
-parser.add_argument('-s', '--sort', metavar='FIELD', type=str,
-                    help='sort by FIELD from specified FIELDS')
-parser.add_argument('-t', '--top', metavar='NUM_USERS', type=int,
-                    help='print only top NUM_USERS')
-
-args = parser.parse_args()
-
-try:
-    start_time = time.time()
-
-    G = io.read_graph(args.path)
-
-    if args.info:
-        print(nx.info(G), '\n')
-
-    if args.radius:
-        print('Graph radius: ', nx.radius(G))
-
-    if args.diameter:
-        print('Graph diameter: ', nx.diameter(G))
-
-    if args.avg_friends:
-        print('Average number of friends: ', stats.avg_num_friends(G))
-
-    if args.avg_followers:
-        print('Average number of followers: ', stats.avg_num_followers(G))
-
-    if args.fields:
-        try:
-            from prettytable import PrettyTable
-        except ImportError:
-            print('This script requires PrettyTable library to be installed.')
-            exit(1)
+def field_column(graph, nodes, field, options):
+    """Return column of field from impl_fields for nodes.
+
+    Field-specific options are taken from dict options, missing ones
+    get default values of field function.
 
-        args_fields = args.fields.split(',')
+    """
+    return field['function'](graph, nodes,
+                             **{option: options[option]
+                                for option in field.get('options', [])
+                                if option in options})
 
-        for i, field in enumerate(args_fields):
-            args_fields[i] = field.lower().strip()
 
-        table_headers = ['Username']
-        table_align = {'Username': 'l'}
-        table_data = {}
+def node_fields(graph, headers, nodes=None, **options):
+    """Return dict with columns of fields with specified headers
+    for nodes (all nodes of graph by default)."""
+    if nodes is None:
+        nodes = graph.nodes()
+    return {field['header']: field_column(graph, nodes, field, options)
+            for field in impl_fields if field['header'] in headers}
 
-        for field in impl_fields:
-            if field['header'] in args_fields:
-                col_header = field['header'].capitalize()
-                table_headers.append(col_header)
-                col_function = field['function']
-                col_function(G, table_data)
-                table_align[col_header] = field['align']
 
-        table = PrettyTable(table_headers)
-        add_rows(table_data, table)
+def write_fields(f, output_format, headers, aligns, columns, rows):
+    """Write rows of fields to file object f as table, CSV or JSON
+    lines."""
+    import utils.table as gtable
 
-        # set align
-        for col_header in table_align:
-            table.align[col_header] = table_align[col_header]
+    if output_format == 'table':
+        f.write(gtable.format_table(headers, aligns, columns, rows) + '\n')
+    elif output_format == 'csv':
+        gtable.write_csv(headers, columns, rows, f)
+    else:
+        gtable.write_jsonl(headers, columns, rows, f)
 
-        table.float_format = '5.5'
 
-        if args.sort:
-            args_sort = args.sort.capitalize()
-            if args_sort in table_headers:
-                table.sortby = args_sort
-                table.reversesort = True
+DESCRIPTION = 'Print characteristics of specified NetworkX graph'
+
+OUTPUT_FORMATS = ('table', 'csv', 'jsonl')
+
+def build_parser(prog=None):
+    """Return parser of command line arguments."""
+    parser = argparse.ArgumentParser(prog=prog, description=DESCRIPTION)
+    parser.add_argument('path', metavar='PATH', type=str,
+                        help='path to YAML file which contains graph data')
+    parser.add_argument('-i', '--info',
+                        help='print general information about graph',
+                        action='store_true')
+    parser.add_argument('--summary', action='store_true',
+                        help='print counts, means, medians, percentiles '
+                        'and histograms of degree, numbers of friends '
+                        'and followers and numbers of users of each sex')
+    parser.add_argument('-r', '--radius', help='print graph radius',
+                        action='store_true')
+    parser.add_argument('-d', '--diameter', help='print graph diameter',
+                        action='store_true')
+
+    parser.add_argument('--max-bfs', metavar='N', type=int,
+                        help='approximate radius, diameter, center and '
+                        'periphery using at most N BFS runs (at least one '
+                        'BFS checks, that graph is connected)')
+
+    parser.add_argument('--pagerank-alpha', metavar='ALPHA', type=float,
+                        help='damping factor of pagerank (default: 0.85)')
+    parser.add_argument('--pagerank-tol', metavar='TOL', type=float,
+                        help='error tolerance of pagerank (default: 1e-06)')
+    parser.add_argument('--pagerank-max-iter', metavar='N', type=int,
+                        help='maximal number of pagerank iterations '
+                        '(default: 100)')
+    parser.add_argument('--pagerank-start', metavar='PATH', type=str,
+                        help='start pagerank from ranks, stored in PATH')
+    parser.add_argument('--pagerank-save', metavar='PATH', type=str,
+                        help='store computed ranks to PATH')
+
+    parser.add_argument('--avg-friends', action='store_true',
+                        help='print average number of friends')
+    parser.add_argument('--avg-followers', action='store_true',
+                        help='print average number of followers')
+
+    parser.add_argument('--avg-clustering', action='store_true',
+                        help='print average clustering coefficient')
+    parser.add_argument('--clustering-samples', metavar='N', type=int,
+                        help='estimate average clustering coefficient '
+                        'from N random nodes')
+
+    parser.add_argument('--communities', action='store_true',
+                        help='print number of communities and modularity')
+    parser.add_argument('--community-seed', metavar='SEED', type=int,
+                        help='seed of random tie-breaking in community '
+                        'detection')
+
+    parser.add_argument('--no-cache', action='store_true',
+                        help='do not read and write cached metrics, which '
+                        'are stored next to graph file')
+
+    parser.add_argument('--progress-events', metavar='PATH', type=str,
+                        help='append progress events in JSON lines '
+                        'format to file, specified by PATH')
+    parser.add_argument('-j', '--jobs', metavar='N', type=int, default=1,
+                        help='number of processes for per-node fields '
+                        'and BFS runs of radius, diameter, center and '
+                        'periphery')
+
+    impl_headers = ','.join([field['header'] for field in impl_fields])
+    parser.add_argument('-f', '--fields', metavar='FIELDS', type=str,
+                        help='print specified fields of each node:\n'
+                        '{}'.format(impl_headers))
+    parser.add_argument('-s', '--sort', metavar='FIELD', type=str,
+                        help='sort by FIELD from specified FIELDS')
+    parser.add_argument('-t', '--top', metavar='NUM_USERS', type=int,
+                        help='print only top NUM_USERS')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='table',
+                        help='format of printed fields: table, or csv and '
+                        'jsonl, which are written row by row')
+    parser.add_argument('-o', '--output', metavar='PATH', type=str,
+                        help='write fields to file, specified by PATH, '
+                        'instead of stdout')
+    parser.add_argument('--memory-profiling', metavar='PATH', type=str,
+                        help='write memory usage of each characteristic '
+                        'in JSON format to file, specified by PATH')
+    return parser
+
+
+def main(args):
+    """Print characteristics of graph with parsed command line
+    arguments args."""
+    out_file = sys.stdout
+    if args.jobs <= 0:
+        print('Number of jobs should be greater than zero.')
+        exit(1)
+
+    if args.clustering_samples is not None:
+        if not args.avg_clustering:
+            print('Please, specify --avg-clustering to estimate it '
+                  'with --clustering-samples.')
+            exit(1)
+        elif args.clustering_samples <= 0:
+            print('Number of clustering samples should be greater '
+                  'than zero.')
+            exit(1)
+
+    if args.format != 'table' and not args.output:
+        # keep stdout clean for written rows, print messages to stderr
+        sys.stdout = sys.stderr
+
+    if args.progress_events:
+        gprint.set_progress_events(args.progress_events)
+
+    if args.memory_profiling:
+        gmemory.start_profiling()
+
+    try:
+        start_time = time.time()
+
+        import graph.io as io
+        with gmemory.stage('Read graph'):
+            G = io.read_graph(args.path)
+
+        if not args.no_cache:
+            use_cache(G, args.path)
+
+        if args.info:
+            import networkx as nx
+            print(nx.info(G), '\n')
+
+        if args.summary:
+            import graph.stats as stats
+            with gmemory.stage('Summary'):
+                summary = stats.summary(G)
+            print(format_summary(summary), '\n')
+
+        if args.radius:
+            import graph.distance as distance
+            with gmemory.stage('Radius'):
+                _, lower, upper = eccentricity_bounds(G, args.max_bfs,
+                                                      args.jobs)
+            print('Graph radius: ',
+                  format_bounds(*distance.radius_bounds(lower, upper)))
+
+        if args.diameter:
+            import graph.distance as distance
+            with gmemory.stage('Diameter'):
+                _, lower, upper = eccentricity_bounds(G, args.max_bfs,
+                                                      args.jobs)
+            print('Graph diameter: ',
+                  format_bounds(*distance.diameter_bounds(lower, upper)))
+
+        if args.avg_friends:
+            import graph.stats as stats
+            print('Average number of friends: ', stats.avg_num_friends(G))
+
+        if args.avg_followers:
+            import graph.stats as stats
+            print('Average number of followers: ', stats.avg_num_followers(G))
+
+        if args.avg_clustering:
+            if args.clustering_samples is not None:
+                import graph.clustering as clustering
+                with gmemory.stage('Average clustering'):
+                    estimate, lower, upper = \
+                        clustering.estimate_avg_clustering(
+                            G, args.clustering_samples)
+                print('Average clustering coefficient: '
+                      '{:.5f} (95% CI: {:.5f} - {:.5f})'.format(
+                          estimate, lower, upper))
+            else:
+                with gmemory.stage('Average clustering'):
+                    value = avg_clustering(G, args.jobs)
+                print('Average clustering coefficient: ', value)
+
+        if args.communities:
+            import numpy as np
+            with gmemory.stage('Communities'):
+                _, labels, modularity = communities(G, args.community_seed)
+            print('Number of communities: ',
+                  len(np.unique(labels)) if len(labels) else 0)
+            print('Modularity: ', modularity)
+
+        if args.fields:
+            import utils.table as gtable
+            args_fields = args.fields.split(',')
+
+            for i, field in enumerate(args_fields):
+                args_fields[i] = field.lower().strip()
+
+            req_fields = [field for field in impl_fields
+                          if field['header'] in args_fields]
+
+            table_headers = ['Username']
+            table_align = ['l']
+            for field in req_fields:
+                table_headers.append(field['header'].capitalize())
+                table_align.append(field['align'])
+
+            args_sort = None
+            if args.sort:
+                args_sort = args.sort.capitalize()
+                if args_sort not in table_headers:
+                    print('Please, specify correct field to sort on:\n',
+                          ', '.join(table_headers))
+                    exit(1)
+
+            nodes = G.nodes()
+
+            # format names only for printed rows
+            def _username(row):
+                uid = nodes[row]
+                return gen_username(G.node[uid]['first_name'],
+                                    G.node[uid]['last_name'],
+                                    uid)
+
+            if args.format == 'table':
+                name_columns = [_username]
             else:
-                print('Please, specify correct field to sort on:\n',
-                      ', '.join(table_headers))
-                exit(1)
-
-        table_str = str(table)
-        if args.top:
-            table_str = top_of_table(table_str, args.top)
-
-        print(table_str)
-
-except FileNotFoundError:
-    print('No such file or directory! Quitting...')
-except IOError:
-    print('IOError happened! Quitting...')
-else:
-    gprint.print_elapsed_time(time.time() - start_time)
+                # machine-readable formats use raw names of fields
+                table_headers = ['uid', 'first_name', 'last_name']
+                table_headers.extend(field['header'] for field in req_fields)
+                name_columns = [nodes.__getitem__]
+                for attr in ('first_name', 'last_name'):
+                    name_columns.append(
+                        lambda row, attr=attr:
+                        G.node[nodes[row]].get(attr, ''))
+
+            field_columns = []
+
+            # fields are computed for all nodes at once,
+            # so progress is counted in computed values of nodes
+            progress = gprint.Progress(len(req_fields) * len(nodes),
+                                       'fields of nodes')
+
+            for n, field in enumerate(req_fields):
+                if ('cell' in field and
+                        field['header'].capitalize() != args_sort):
+                    # compute values of field only for written rows
+                    field_columns.append(
+                        lambda row, cell=field['cell']: cell(G, nodes[row]))
+                else:
+                    with gmemory.stage('Field ' + field['header']):
+                        field_columns.append(
+                            field_column(G, nodes, field, vars(args)))
+                progress.update((n + 1) * len(nodes))
+
+            progress.finish()
+
+            sort_column = None
+            if args_sort == 'Username':
+                sort_column = [_username(row) for row in range(len(nodes))]
+            elif args_sort:
+                sort_column = field_columns[
+                    [field['header'].capitalize()
+                     for field in req_fields].index(args_sort)]
+
+            table_columns = name_columns + field_columns
+            rows = gtable.select_rows(len(nodes), sort_column, args.top)
+            # cells of lazily computed fields are computed on writing
+            rows = gprint.iter_progress(rows, 'rows', len(rows))
+
+            with gmemory.stage('Write fields'):
+                if args.output:
+                    with open(args.output, 'w', newline='') as f:
+                        write_fields(f, args.format, table_headers,
+                                     table_align, table_columns, rows)
+                else:
+                    write_fields(out_file, args.format, table_headers,
+                                 table_align, table_columns, rows)
+
+        if not args.no_cache:
+            store_cache(G)
+
+    except FileNotFoundError:
+        print('No such file or directory! Quitting...')
+    except IOError:
+        print('IOError happened! Quitting...')
+    else:
+        gprint.print_elapsed_time(time.time() - start_time)
+    finally:
+        sys.stdout = out_file
+
+    if args.memory_profiling:
+        gmemory.write_report(args.memory_profiling, 'info')
+
+
+if __name__ == '__main__':
+    main(build_parser().parse_args())
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Crawl, filter, analyse and export graph in one process.
+
+The same steps, as get.py --> process.py --> info.py, but the graph
+is passed between them in memory, without writing it to file and
+reading it back at each step:
+
+    import pipeline
+
+    graph = pipeline.crawl([55358627], recursion_level=2,
+                           with_num_followers=True)
+    graph = pipeline.filter_graph(graph, exclude_media_activists=True,
+                                  trim=3)
+    nodes, columns = pipeline.node_fields(graph, ['degree', 'pagerank'])
+    pipeline.export(graph, 'mine.pickle')
+    pipeline.export_fields(graph, nodes, columns, 'mine.csv')
+
+"""
+
+import argparse
+import time
+
+import graph.io as io
+
+import info
+import process
+
+import utils.memory as gmemory
+import utils.print as gprint
+import utils.table as gtable
+
+DESCRIPTION = 'Get graph of vk.com users (or read it from file), ' \
+              'process it and print characteristics of its nodes ' \
+              'without intermediate files'
+
+FIELD_FORMATS = ('table', 'csv', 'jsonl')
+
+
+def crawl(uids, data_attributes=('first_name', 'last_name', 'sex'),
+          with_num_followers=False, recursion_level=1, pool_size=1,
+          with_likes=False, likes_cache=None):
+    """Get graph of vk.com users with specified uids, their friends,
+    friends of friends, etc. up to recursion_level.
+
+    If with_likes is True, number of likes between friends is stored
+    in 'weight' attribute of edges.
+
+    """
+    # vkontakte package is required only for crawling
+    import get
+
+    return get.construct_graph(uids=uids,
+                               required_attributes=tuple(data_attributes),
+                               with_num_followers=with_num_followers,
+                               max_recursion_level=recursion_level,
+                               pool_size=pool_size,
+                               with_likes=with_likes,
+                               likes_cache=likes_cache)
+
+
+def filter_graph(graph, exclude_media_activists=False, uids=None,
+                 trim=None, k_core=None, exclude_alone=False,
+                 communities=False, community_seed=None, jobs=1,
+                 in_place=False, sample=None, sample_size=None,
+                 sample_seed=None):
+    """Apply process.py operations to graph and return result graph.
+
+    If sample is one of graph.sampling.methods, keep only sample_size
+    nodes, chosen by it. If communities is True, store number of
+    community of each node in its 'community' attribute.
+
+    """
+    stages = process.build_stages(
+        graph, exclude_media_activists=exclude_media_activists, uids=uids,
+        trim=trim, k_core=k_core, exclude_alone=exclude_alone, jobs=jobs,
+        sample=sample, sample_size=sample_size, sample_seed=sample_seed)
+    graph = process.run_pipeline(graph, stages, in_place=in_place)
+
+    if communities:
+        process.assign_communities(graph, community_seed)
+
+    return graph
+
+
+def node_fields(graph, fields, nodes=None, **options):
+    """Return tuple (nodes, columns): list of nodes (all nodes of graph
+    by default) and dict with columns of info.py fields for them.
+
+    Options of fields (like pagerank_alpha or jobs) are passed as
+    keyword arguments. Raise ValueError if some of fields are unknown.
+
+    """
+    unknown = set(fields) - set(field_headers())
+    if unknown:
+        raise ValueError('Unknown fields: {}'.format(
+            ', '.join(sorted(unknown))))
+    if nodes is None:
+        nodes = graph.nodes()
+    return nodes, info.node_fields(graph, fields, nodes, **options)
+
+
+def field_headers():
+    """Return list with headers of fields, which node_fields() can
+    compute."""
+    return [field['header'] for field in info.impl_fields]
+
+
+def export(graph, path):
+    """Write graph to file in format, chosen by its extension."""
+    io.write_graph(graph, path)
+
+
+def export_fields(graph, nodes, columns, path, output_format='csv',
+                  sort=None, top=None):
+    """Write columns of node fields to file in table, CSV or JSON lines
+    format, optionally sorted by field sort (one of columns, in any
+    case) and limited to top rows. Raise ValueError if sort is not
+    one of columns."""
+    if sort is not None:
+        sort = sort.lower()
+        if sort not in columns:
+            raise ValueError('Unknown field to sort on: {}'.format(sort))
+    headers = ['uid', 'first_name', 'last_name'] + list(columns)
+    table_columns = [nodes.__getitem__]
+    for attr in ('first_name', 'last_name'):
+        table_columns.append(
+            lambda row, attr=attr: graph.node[nodes[row]].get(attr, ''))
+    table_columns.extend(columns.values())
+
+    rows = gtable.select_rows(len(nodes), columns.get(sort), top)
+
+    with open(path, 'w', newline='') as f:
+        if output_format == 'table':
+            aligns = ['r', 'l', 'l'] + ['r'] * len(columns)
+            f.write(gtable.format_table(headers, aligns, table_columns,
+                                        rows) + '\n')
+        elif output_format == 'csv':
+            gtable.write_csv(headers, table_columns, rows, f)
+        else:
+            gtable.write_jsonl(headers, table_columns, rows, f)
+
+
+def build_parser(prog=None):
+    """Return parser of command line arguments."""
+    parser = argparse.ArgumentParser(prog=prog, description=DESCRIPTION)
+    parser.add_argument('uids', metavar='UID', type=int, nargs='*',
+                        help='UID of vk.com user')
+    parser.add_argument('--src', metavar='PATH', type=str,
+                        help='read graph from PATH instead of getting it '
+                        'from vk.com')
+    parser.add_argument('-r', '--recursion-level', metavar='N', type=int,
+                        default=1, help='recursion deepness of crawling')
+    parser.add_argument('-p', '--pool-size', metavar='N', type=int,
+                        default=1, help='number of downloading '
+                        'processes in pool')
+    parser.add_argument('--with-num-followers', action='store_true',
+                        help='get number of followers per user')
+
+    parser.add_argument('--exclude-media-activists', action='store_true',
+                        help='exclude media-activists from graph')
+    parser.add_argument('--exclude-alone', action='store_true',
+                        help='exclude not connected nodes from graph')
+    parser.add_argument('--trim', metavar='N', type=int,
+                        default=process.DEFAULT_TRIM,
+                        help='trim nodes with less than N connected edges')
+    parser.add_argument('--k-core', metavar='N', type=int,
+                        help='repeatedly trim nodes with less than N '
+                        'connected edges, until nothing changes')
+    parser.add_argument('--communities', action='store_true',
+                        help='store communities in community attribute '
+                        'of nodes')
+    parser.add_argument('-j', '--jobs', metavar='N', type=int, default=1,
+                        help='number of processes for per-node operations')
+
+    parser.add_argument('-w', '--write-to', metavar='PATH', type=str,
+                        help='write processed graph to PATH')
+    parser.add_argument('-f', '--fields', metavar='FIELDS', type=str,
+                        help='compute specified fields of each node: '
+                        '{}'.format(','.join(field_headers())))
+    parser.add_argument('-s', '--sort', metavar='FIELD', type=str,
+                        help='sort by FIELD from specified FIELDS')
+    parser.add_argument('-t', '--top', metavar='NUM_USERS', type=int,
+                        help='write only top NUM_USERS')
+    parser.add_argument('--format', choices=FIELD_FORMATS, default='csv',
+                        help='format of file with fields')
+    parser.add_argument('-o', '--output', metavar='PATH', type=str,
+                        help='write fields to file, specified by PATH')
+    parser.add_argument('--memory-profiling', metavar='PATH', type=str,
+                        help='write memory usage of each step in JSON '
+                        'format to file, specified by PATH')
+    return parser
+
+
+def main(args):
+    """Run pipeline with parsed command line arguments args."""
+    if args.jobs <= 0:
+        print('Number of jobs should be greater than zero.')
+        exit(1)
+
+    if not args.uids and not args.src:
+        print('Please, specify UIDs or source file with --src.')
+        exit(1)
+    if args.fields and not args.output:
+        print('Please, specify file for fields with --output.')
+        exit(1)
+
+    fields = []
+    if args.fields:
+        fields = [field.lower().strip()
+                  for field in args.fields.split(',')]
+        unknown = [field for field in fields
+                   if field not in field_headers()]
+        if unknown:
+            print('Unknown fields: {}. Please, specify fields from:\n'
+                  ' {}'.format(', '.join(unknown),
+                               ', '.join(field_headers())))
+            exit(1)
+    if args.sort and not fields:
+        print('Please, specify fields with --fields to sort on.')
+        exit(1)
+    if args.sort and args.sort.lower() not in fields:
+        print('Please, specify correct field to sort on:\n',
+              ', '.join(fields))
+        exit(1)
+
+    if args.memory_profiling:
+        gmemory.start_profiling()
+
+    start_time = time.time()
+
+    try:
+        if args.src:
+            with gmemory.stage('Read graph'):
+                G = io.read_graph(args.src)
+        else:
+            with gmemory.stage('Crawl'):
+                G = crawl(args.uids,
+                          with_num_followers=args.with_num_followers,
+                          recursion_level=args.recursion_level,
+                          pool_size=args.pool_size)
+
+        with gmemory.stage('Filter'):
+            G = filter_graph(
+                G, exclude_media_activists=args.exclude_media_activists,
+                trim=args.trim, k_core=args.k_core,
+                exclude_alone=args.exclude_alone,
+                communities=args.communities, jobs=args.jobs)
+
+        if args.write_to:
+            with gmemory.stage('Write graph'):
+                export(G, args.write_to)
+
+        if fields:
+            with gmemory.stage('Fields'):
+                nodes, columns = node_fields(G, fields, jobs=args.jobs)
+            with gmemory.stage('Write fields'):
+                export_fields(G, nodes, columns, args.output, args.format,
+                              args.sort, args.top)
+            print('Write fields to: {}'.format(args.output))
+    except FileNotFoundError:
+        print('No such file or directory! Quitting...')
+    except IOError:
+        print('IOError happened! Quitting...')
+    else:
+        gprint.print_elapsed_time(time.time() - start_time)
+
+    if args.memory_profiling:
+        gmemory.write_report(args.memory_profiling, 'pipeline')
+
+
+if __name__ == '__main__':
+    main(build_parser().parse_args())
@@ -2,48 +2,66 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import os
 import time
 import math
+from multiprocessing import Pool
 
-try:
-    import networkx as nx
-except ImportError:
-    print('This script requires NetworkX to be installed.')
-    exit(1)
+# NetworkX, NumPy and graph modules are imported only by functions,
+# which use them, like matplotlib, so parsing of arguments does not
+# wait for them
 
-import graph.io as io
+import utils.memory as gmemory
 import utils.print as gprint
 
 DESCRIPTION = 'Plot NetworkX graph which specified in YAML file'
 
+# level of detail mode: default number of drawn nodes and size of image
+# with edges in pixels
+DEFAULT_LOD_TOP = 100
+DEFAULT_LOD_RESOLUTION = 1024
+# maximal number of edge points, rasterised in one step
+MAX_EDGE_POINTS = 1 << 22
+
+
+def assign_labels(graph, nodes=None):
+    '''create dict with human-readable labels, assigned to nodes
+    (all nodes of graph by default)'''
+    if nodes is None:
+        nodes = graph.nodes()
 
-def assign_labels(graph):
-    '''create dict with human-readable labels, assigned to nodes'''
     labels = {}
-    for node in graph.nodes_iter(data=True):
+    for node in nodes:
         try:
-            labels[node[0]] = '{first_name} {last_name}'.format(**node[1])
+            labels[node] = '{first_name} {last_name}'.format(
+                **graph.node[node])
         except KeyError as e:
             print('There is no such data attribute: {0}'
-                  ' in {1}'.format(e, node[0]))
+                  ' in {1}'.format(e, node))
     return labels
 
 
-def assign_node_colors(graph):
+def assign_node_colors(graph, nodes=None):
     """assign colors to nodes by number of friends contained in graph."""
+    if nodes is None:
+        nodes = graph.nodes()
+
     colors = []
-    for node in graph.nodes_iter():
+    for node in nodes:
         node_color = math.log(1 + graph.degree(node))
         colors.append(node_color)
     return colors
 
 
-def assign_node_sizes(graph, default_size=100, default_scale=25):
+def assign_node_sizes(graph, nodes=None, default_size=100, default_scale=25):
     """assign node sizes by total number of friends in whole network."""
+    if nodes is None:
+        nodes = graph.nodes()
+
     sizes = []
-    for node in graph.nodes_iter(data=True):
+    for node in nodes:
         try:
-            node_size = node[1]['friends_total'] / default_scale
+            node_size = graph.node[node]['friends_total'] / default_scale
             node_size += 1
             node_size *= default_size
             sizes.append(node_size)
@@ -54,14 +72,17 @@ def assign_node_sizes(graph, default_size=100, default_scale=25):
 
 def assign_edge_colors(graph):
     """Highlight edges from central nodes."""
+    import networkx as nx
+    import graph.distance as distance
+
     color_list = []
     try:
-        central_nodes = set(nx.center(G))
+        central_nodes = set(distance.bounded_center(graph))
     except nx.exception.NetworkXError:
-        for edge in G.edges_iter():
+        for edge in graph.edges_iter():
             color_list.append('y')
     else:
-        for edge in G.edges_iter():
+        for edge in graph.edges_iter():
             if ((edge[0] in central_nodes) or
                     (edge[1] in central_nodes)):
                 color_list.append('r')
@@ -70,56 +91,348 @@ def assign_edge_colors(graph):
 
     return color_list
 
-parser = argparse.ArgumentParser(description=DESCRIPTION)
-parser.add_argument('path', metavar='SOURCE', type=str,
-                    help='path to file which contains graph data.')
-parser.add_argument('-o', '--output', type=str,
-                    help='path to file for writing plot image')
-parser.add_argument('--with-latex', action='store_true',
-                    help='use LaTeX for text processing')
-parser.add_argument('--no-labels', action='store_true',
-                    help='draw graph without labels')
-parser.add_argument('--dpi', type=int, help='set dpi')
-
-args = parser.parse_args()
-
-try:
-    # configure pyplot before import
-    if args.with_latex:
-        from matplotlib import rc
-        rc('font', **{'family': 'sans-serif', 'sans-serif': ['Monospace']})
-        rc('text', usetex=True)
-        rc('text.latex', unicode=True)
-        rc('text.latex', preamble='\\usepackage[utf8]{inputenc}')
-        rc('text.latex', preamble='\\usepackage[russian]{babel}')
-
-    import matplotlib.pyplot as plt
-    plt.switch_backend('GTK3Cairo')
-except ImportError:
-    print('Matplotlib, gobject and cairo are required to run this script.')
-
-try:
-    start_time = time.time()
-    G = io.read_graph((args.path))
-
-    nx.draw(G,
-            labels=assign_labels(G),
-            with_labels=not args.no_labels,
-            cmap=plt.cm.YlOrRd,
-            node_size=assign_node_sizes(G),
-            node_color=assign_node_colors(G),
-            edge_color=assign_edge_colors(G),
-            )
-
-    if args.output:
-        # store plot to file
-        plt.savefig(args.output, dpi=args.dpi)
-        gprint.print_elapsed_time(time.time() - start_time)
+
+def node_positions(graph, path, num_iter=None, seed=None, use_cache=True):
+    """Return dict with positions of nodes, computed by force-directed
+    layout with num_iter iterations (graph.layout.DEFAULT_NUM_ITER
+    by default), or loaded from metric cache of graph file path."""
+    import graph.cache as cache
+    import graph.layout as layout
+
+    if num_iter is None:
+        num_iter = layout.DEFAULT_NUM_ITER
+    key = ('layout', num_iter, seed)
+    metrics = {}
+    if use_cache:
+        file_key = cache.file_key(path)
+        metrics = cache.load_metrics(cache.cache_path(path), file_key)
+
+    if key not in metrics:
+        print('Compute layout...')
+        nodes = graph.nodes()
+        metrics[key] = (nodes, layout.layout(graph, nodes, num_iter, seed))
+        if use_cache:
+            cache.store_metrics(cache.cache_path(path), file_key, metrics)
+
+    nodes, positions = metrics[key]
+    return dict(zip(nodes, positions.tolist()))
+
+
+def configure_latex():
+    """Use LaTeX for text processing in matplotlib."""
+    from matplotlib import rc
+    rc('font', **{'family': 'sans-serif', 'sans-serif': ['Monospace']})
+    rc('text', usetex=True)
+    rc('text.latex', unicode=True)
+    rc('text.latex', preamble='\\usepackage[utf8]{inputenc}')
+    rc('text.latex', preamble='\\usepackage[russian]{babel}')
+
+
+def draw_graph(graph, ax, positions, with_labels=True):
+    """Draw graph on matplotlib axes: all edges as one line collection
+    and all nodes as one scatter plot."""
+    import numpy as np
+    from matplotlib.collections import LineCollection
+
+    nodes = graph.nodes()
+    index = {node: i for i, node in enumerate(nodes)}
+    xy = np.array([positions[node] for node in nodes],
+                  dtype=np.float64).reshape(-1, 2)
+
+    edges = np.array([(index[u], index[v]) for u, v in graph.edges_iter()],
+                     dtype=np.int64).reshape(-1, 2)
+    ax.add_collection(LineCollection(xy[edges],
+                                     colors=assign_edge_colors(graph),
+                                     zorder=1))
+    ax.scatter(xy[:, 0], xy[:, 1],
+               s=assign_node_sizes(graph),
+               c=assign_node_colors(graph),
+               cmap='YlOrRd', zorder=2)
+
+    if with_labels:
+        for node, label in assign_labels(graph).items():
+            x, y = xy[index[node]]
+            ax.text(x, y, label, fontsize=8, zorder=3,
+                    horizontalalignment='center',
+                    verticalalignment='center')
+
+    ax.set_axis_off()
+
+
+def rasterize_edges(xy, edges, resolution=DEFAULT_LOD_RESOLUTION):
+    """Return image of shape (resolution, resolution) with number of
+    edges, which pass through each pixel.
+
+    Positions of nodes xy should be in unit square. Each edge is
+    sampled about once per pixel along its length, and samples of all
+    edges are summed up, so the cost of image does not depend on
+    number of nodes.
+
+    """
+    import numpy as np
+
+    density = np.zeros(resolution * resolution, dtype=np.float64)
+    if len(edges) == 0:
+        return density.reshape(resolution, resolution)
+
+    starts = xy[edges[:, 0]] * (resolution - 1)
+    ends = xy[edges[:, 1]] * (resolution - 1)
+    num_points = np.ceil(np.abs(ends - starts).max(axis=1)).astype(
+        np.int64) + 1
+
+    # split edges into steps with bounded number of sampled points
+    point_bounds = np.concatenate(([0], np.cumsum(num_points)))
+    lo = 0
+    while lo < len(edges):
+        hi = np.searchsorted(point_bounds, point_bounds[lo] + MAX_EDGE_POINTS,
+                             side='right') - 1
+        hi = min(max(hi, lo + 1), len(edges))
+
+        step_points = num_points[lo:hi]
+        edge_ids = np.repeat(np.arange(lo, hi), step_points)
+        group_starts = np.cumsum(step_points) - step_points
+        offsets = (np.arange(len(edge_ids)) -
+                   np.repeat(group_starts, step_points))
+        t = offsets / np.maximum(num_points[edge_ids] - 1, 1)
+
+        points = (starts[edge_ids] +
+                  (ends[edge_ids] - starts[edge_ids]) * t[:, np.newaxis])
+        pixels = np.rint(points).astype(np.int64)
+        density += np.bincount(pixels[:, 0] * resolution + pixels[:, 1],
+                               minlength=resolution * resolution)
+        lo = hi
+
+    return density.reshape(resolution, resolution)
+
+
+def top_nodes(graph, nodes, top=DEFAULT_LOD_TOP, top_by='degree'):
+    """Return list of top nodes by degree or total number of friends."""
+    import numpy as np
+    import graph.arrays as arrays
+
+    if top_by == 'degree':
+        values = np.array([graph.degree(node) for node in nodes],
+                          dtype=np.float64)
+    else:
+        columns, _ = arrays.attribute_columns(graph, ('friends_total',),
+                                              nodes)
+        values = columns['friends_total']
+
+    if top < len(nodes):
+        rows = np.argpartition(-values, top - 1)[:top]
     else:
-        # interactive drawing
-        gprint.print_elapsed_time(time.time() - start_time)
-        plt.show()
-except FileNotFoundError:
-    print('No such file or directory! Quitting...')
-except IOError:
-    print('IOError happened! Quitting...')
+        rows = np.arange(len(nodes))
+    return [nodes[row] for row in rows[np.argsort(-values[rows])]]
+
+
+def draw_graph_lod(graph, ax, positions, top=DEFAULT_LOD_TOP,
+                   top_by='degree', resolution=DEFAULT_LOD_RESOLUTION,
+                   with_labels=True):
+    """Draw graph on matplotlib axes with bounded level of detail:
+    edges as image of their density, and only top nodes as markers."""
+    import numpy as np
+
+    nodes = graph.nodes()
+    index = {node: i for i, node in enumerate(nodes)}
+    xy = np.array([positions[node] for node in nodes],
+                  dtype=np.float64).reshape(-1, 2)
+
+    edges = np.array([(index[u], index[v]) for u, v in graph.edges_iter()],
+                     dtype=np.int64).reshape(-1, 2)
+    density = rasterize_edges(xy, edges, resolution)
+    # image rows are y coordinates, empty pixels are transparent,
+    # and single edges are still visible
+    intensity = np.log1p(density)
+    ax.imshow(np.ma.masked_equal(intensity.T, 0),
+              origin='lower', extent=(0, 1, 0, 1), cmap='Greys',
+              vmin=-intensity.max() / 2, interpolation='nearest', zorder=1)
+
+    selected = top_nodes(graph, nodes, top, top_by)
+    selected_xy = xy[[index[node] for node in selected]].reshape(-1, 2)
+    ax.scatter(selected_xy[:, 0], selected_xy[:, 1],
+               s=assign_node_sizes(graph, selected),
+               c=assign_node_colors(graph, selected),
+               cmap='YlOrRd', zorder=2)
+
+    if with_labels:
+        for node, label in assign_labels(graph, selected).items():
+            x, y = xy[index[node]]
+            ax.text(x, y, label, fontsize=8, zorder=3,
+                    horizontalalignment='center',
+                    verticalalignment='center')
+
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    ax.set_axis_off()
+
+
+def draw(graph, ax, positions, options):
+    """Draw graph in mode, specified by parsed command line options."""
+    if options['lod']:
+        draw_graph_lod(graph, ax, positions, options['lod_top'],
+                       options['lod_top_by'], options['lod_resolution'],
+                       with_labels=not options['no_labels'])
+    else:
+        draw_graph(graph, ax, positions,
+                   with_labels=not options['no_labels'])
+
+
+def render_file(task):
+    """Render graph from file to image file without display.
+
+    Task is a tuple (path to graph, path to image, options), where
+    options is a dict with parsed command line arguments. Image format
+    is chosen by extension of image file.
+
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import graph.io as io
+
+    path, output, options = task
+    with gmemory.stage('Read graph'):
+        graph = io.read_graph(path)
+    with gmemory.stage('Layout'):
+        positions = node_positions(graph, path, options['layout_iter'],
+                                   options['seed'],
+                                   use_cache=not options['no_cache'])
+
+    with gmemory.stage('Draw'):
+        figure = Figure()
+        FigureCanvasAgg(figure)
+        ax = figure.add_subplot(1, 1, 1)
+        draw(graph, ax, positions, options)
+        figure.savefig(output, dpi=options['dpi'])
+    return output
+
+
+def output_path(path, output_dir, output_format):
+    """Path to image of graph file path in output_dir."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(output_dir, '{}.{}'.format(name, output_format))
+
+
+def build_parser(prog=None):
+    """Return parser of command line arguments."""
+    parser = argparse.ArgumentParser(prog=prog, description=DESCRIPTION)
+    parser.add_argument('paths', metavar='SOURCE', type=str, nargs='+',
+                        help='path to file which contains graph data.')
+    parser.add_argument('-o', '--output', type=str,
+                        help='path to file for writing plot image')
+    parser.add_argument('--output-dir', metavar='DIR', type=str,
+                        help='write plot image of each SOURCE to DIR')
+    parser.add_argument('--format', choices=('png', 'pdf', 'svg'),
+                        default='png',
+                        help='format of images, written to --output-dir')
+    parser.add_argument('-j', '--jobs', metavar='N', type=int, default=1,
+                        help='number of processes for rendering of '
+                        'several graphs')
+    parser.add_argument('--with-latex', action='store_true',
+                        help='use LaTeX for text processing')
+    parser.add_argument('--no-labels', action='store_true',
+                        help='draw graph without labels')
+    parser.add_argument('--dpi', type=int, help='set dpi')
+    parser.add_argument('--lod', action='store_true',
+                        help='draw large graph with bounded level of '
+                        'detail: edges as density image, and only top '
+                        'nodes with labels')
+    parser.add_argument('--lod-top', metavar='N', type=int,
+                        default=DEFAULT_LOD_TOP,
+                        help='number of drawn nodes in --lod mode')
+    parser.add_argument('--lod-top-by', choices=('degree', 'friends'),
+                        default='degree',
+                        help='select drawn nodes in --lod mode by degree '
+                        'or by total number of friends')
+    parser.add_argument('--lod-resolution', metavar='PX', type=int,
+                        default=DEFAULT_LOD_RESOLUTION,
+                        help='size of edge density image in --lod mode')
+    parser.add_argument('--layout-iter', metavar='N', type=int,
+                        help='number of iterations of force-directed '
+                        'layout (default: 50)')
+    parser.add_argument('--seed', type=int,
+                        help='seed of random initial layout')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='do not read and write cached layout, which '
+                        'is stored next to graph file')
+    parser.add_argument('--memory-profiling', metavar='PATH', type=str,
+                        help='write memory usage of reading, layout and '
+                        'drawing in JSON format to file, specified by '
+                        'PATH (graphs are plotted in one process)')
+    return parser
+
+
+def main(args):
+    """Plot graphs with parsed command line arguments args."""
+    if args.jobs <= 0:
+        print('Number of jobs should be greater than zero.')
+        exit(1)
+
+    if args.output_dir:
+        tasks = [(path, output_path(path, args.output_dir, args.format),
+                  vars(args)) for path in args.paths]
+    elif len(args.paths) > 1:
+        print('Please, specify --output-dir to plot several graphs.')
+        exit(1)
+    elif args.output:
+        tasks = [(args.paths[0], args.output, vars(args))]
+    else:
+        tasks = []
+
+    try:
+        # configure matplotlib before import of pyplot
+        if args.with_latex:
+            configure_latex()
+
+        if not tasks:
+            import matplotlib.pyplot as plt
+            plt.switch_backend('GTK3Cairo')
+    except ImportError:
+        print('Matplotlib, gobject and cairo are required '
+              'to run this script.')
+        exit(1)
+
+    if args.memory_profiling:
+        # allocations are traced only in this process
+        args.jobs = 1
+        gmemory.start_profiling()
+
+    try:
+        start_time = time.time()
+
+        if tasks:
+            # render to files without display
+            if args.jobs > 1 and len(tasks) > 1:
+                initializer = configure_latex if args.with_latex else None
+                with Pool(processes=args.jobs,
+                          initializer=initializer) as pool:
+                    for output in pool.imap_unordered(render_file, tasks):
+                        print('Write plot to: {}'.format(output))
+            else:
+                for task in tasks:
+                    print('Write plot to: {}'.format(render_file(task)))
+            gprint.print_elapsed_time(time.time() - start_time)
+        else:
+            # interactive drawing
+            import graph.io as io
+            with gmemory.stage('Read graph'):
+                G = io.read_graph(args.paths[0])
+            with gmemory.stage('Layout'):
+                positions = node_positions(G, args.paths[0],
+                                           args.layout_iter, args.seed,
+                                           use_cache=not args.no_cache)
+            with gmemory.stage('Draw'):
+                _, ax = plt.subplots()
+                draw(G, ax, positions, vars(args))
+            gprint.print_elapsed_time(time.time() - start_time)
+            plt.show()
+    except FileNotFoundError:
+        print('No such file or directory! Quitting...')
+    except IOError:
+        print('IOError happened! Quitting...')
+
+    if args.memory_profiling:
+        gmemory.write_report(args.memory_profiling, 'plot')
+
+
+if __name__ == '__main__':
+    main(build_parser().parse_args())
@@ -2,18 +2,16 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import random
 import time
 
-try:
-    import networkx as nx
-except ImportError:
-    print('This script requires NetworkX to be installed.')
-    exit(1)
+# NetworkX, NumPy and graph modules, which depend on them, are imported
+# only by operations, which use them, so stream mode does not wait
+# for NetworkX
 
-import graph.io as io
-import graph.stats as stats
-import graph.predicates as predicates
+import graph.sampling as sampling
 
+import utils.memory as gmemory
 import utils.print as gprint
 
 DESCRIPTION = 'Load NX graph from SOURCE, ' \
@@ -22,74 +20,244 @@ DESCRIPTION = 'Load NX graph from SOURCE, ' \
 DEFAULT_TRIM = 1
 
 
-def trim(graph, min_num_nodes):
-    '''Return copy of graph with only nodes with number of edges greater,
-    than min_num_nodes.'''
-
-    print('Trim nodes with less than {0} '
-          'connected edges:'.format(min_num_nodes))
-
-    # make copy of graph to count neighbors per node
-    res_graph = graph.copy()
+def media_activists_stage(graph):
+    '''Return pipeline stage, which excludes 'media-activists'.'''
+    import graph.predicates as predicates
+
+    nodes = graph.nodes()
+    mask = predicates.media_activists_mask(graph, nodes)
+    media_activists = {nodes[i] for i in mask.nonzero()[0]}
+
+    def _is_not_media_activist(node, data):
+        return node not in media_activists
+
+    return {
+        'title': 'Exclude media-activists',
+        'predicate': _is_not_media_activist,
+    }
+
+
+def uids_stage(uids):
+    '''Return pipeline stage, which keeps only nodes with specified uids.'''
+    def _has_uid(node, data):
+        return node in uids
+
+    return {
+        'title': 'Filter by uids: {}'.format(uids),
+        'predicate': _has_uid,
+    }
+
+
+def trim_stage(min_num_nodes, jobs=1):
+    '''Return pipeline stage, which keeps only nodes with number of edges
+    to selected nodes greater, than min_num_nodes.
+
+    If jobs is greater than 1, count edges in jobs processes.'''
+    def _select(graph, selected):
+        progress = gprint.Progress(len(selected), 'trim')
+        res_selected = set()
+        for n, node in enumerate(selected):
+            progress.update(n + 1)
+            degree = 0
+            for neighbor in graph.neighbors_iter(node):
+                if neighbor in selected:
+                    # self-loop is counted twice, like in graph.degree
+                    degree += 2 if neighbor == node else 1
+            if degree >= min_num_nodes:
+                res_selected.add(node)
+        progress.finish()
+        return res_selected
+
+    def _select_parallel(graph, selected):
+        import numpy as np
+        import graph.arrays as arrays
+        import graph.parallel as parallel
+
+        nodes = graph.nodes()
+        indptr, indices = arrays.csr_adjacency(graph, nodes)
+        is_selected = np.array([node in selected for node in nodes],
+                               dtype=bool)
+        degrees = parallel.map_nodes('selected_degree', indptr, indices,
+                                     jobs=jobs,
+                                     extra={'selected': is_selected})
+        keep = is_selected & (degrees >= min_num_nodes)
+        return {nodes[i] for i in keep.nonzero()[0]}
+
+    return {
+        'title': 'Trim nodes with less than {0} '
+                 'connected edges'.format(min_num_nodes),
+        'select': _select if jobs == 1 else _select_parallel,
+    }
+
+
+def k_core_stage(min_num_nodes):
+    '''Return pipeline stage, which repeatedly trims nodes with less than
+    min_num_nodes edges to selected nodes, until nothing changes.'''
+    def _select(graph, selected):
+        res_selected = set(selected)
+
+        # number of edges to selected nodes per node
+        progress = gprint.Progress(len(res_selected), 'k-core')
+        degrees = {}
+        for n, node in enumerate(res_selected):
+            progress.update(n + 1)
+            degree = 0
+            for neighbor in graph.neighbors_iter(node):
+                if neighbor in res_selected:
+                    # self-loop is counted twice, like in graph.degree
+                    degree += 2 if neighbor == node else 1
+            degrees[node] = degree
+        progress.finish()
+
+        # peel nodes one by one, updating degrees of their neighbors
+        to_remove = [node for node in res_selected
+                     if degrees[node] < min_num_nodes]
+        res_selected.difference_update(to_remove)
+        while to_remove:
+            node = to_remove.pop()
+            for neighbor in graph.neighbors_iter(node):
+                if neighbor in res_selected:
+                    degrees[neighbor] -= 1
+                    if degrees[neighbor] < min_num_nodes:
+                        res_selected.remove(neighbor)
+                        to_remove.append(neighbor)
+        return res_selected
+
+    return {
+        'title': 'Iteratively trim nodes with less than {0} '
+                 'connected edges'.format(min_num_nodes),
+        'select': _select,
+    }
+
+
+def sample_stage(method, size, seed=None):
+    '''Return pipeline stage, which keeps only size of selected nodes,
+    chosen by sampling method from graph.sampling.methods.'''
+    def _select(graph, selected):
+        return sampling.sample(graph, selected, size, method,
+                               random.Random(seed))
+
+    return {
+        'title': 'Sample {0} nodes by {1} sampling'.format(size, method),
+        'select': _select,
+    }
+
+
+def run_pipeline(graph, stages, in_place=False):
+    '''Apply stages to graph and return result graph.
+
+    Each stage is a dict with 'title' and either 'predicate' -- function
+    of (node, data), which returns True for nodes to keep, or 'select' --
+    function of (graph, selected), which returns set of nodes to keep.
+    Consecutive predicates are evaluated together in one pass over nodes.
+    Stages do not copy graph: result graph is a subgraph of source graph
+    or, if in_place is set, source graph with removed nodes.'''
+
+    # nodes, which passed all previous stages
+    selected = set(graph.nodes_iter())
+
+    i = 0
+    while i < len(stages):
+        if 'select' in stages[i]:
+            print('{}:'.format(stages[i]['title']))
+            with gmemory.stage(stages[i]['title']):
+                selected = stages[i]['select'](graph, selected)
+            i += 1
+        else:
+            # fuse consecutive predicates into one pass
+            fused = []
+            titles = []
+            while i < len(stages) and 'predicate' in stages[i]:
+                print('{}:'.format(stages[i]['title']))
+                fused.append(stages[i]['predicate'])
+                titles.append(stages[i]['title'])
+                i += 1
+
+            with gmemory.stage(' + '.join(titles)):
+                progress = gprint.Progress(len(selected), 'filter')
+                res_selected = set()
+                for n, node in enumerate(selected):
+                    progress.update(n + 1)
+                    data = graph.node[node]
+                    if all(predicate(node, data) for predicate in fused):
+                        res_selected.add(node)
+                progress.finish()
+                selected = res_selected
+
+        print()
+
+    with gmemory.stage('Build result graph'):
+        if in_place:
+            graph.remove_nodes_from([node for node in graph.nodes()
+                                     if node not in selected])
+            return graph
+        else:
+            return graph.subgraph(selected)
+
+
+def build_stages(graph, exclude_media_activists=False, uids=None,
+                 trim=DEFAULT_TRIM, k_core=None, exclude_alone=False,
+                 jobs=1, sample=None, sample_size=None, sample_seed=None):
+    '''Return list of pipeline stages for requested operations
+    in the order, in which process.py applies them.
+
+    Sampling is applied last, to nodes, which passed all filters.'''
+    stages = []
+
+    if exclude_media_activists:
+        stages.append(media_activists_stage(graph))
+
+    if uids:
+        stages.append(uids_stage(set(uids)))
+
+    if trim is not None and trim > DEFAULT_TRIM:
+        stages.append(trim_stage(trim, jobs))
+
+    if k_core:
+        stages.append(k_core_stage(k_core))
+
+    if exclude_alone:
+        stages.append(trim_stage(1, jobs))
+
+    if sample:
+        stages.append(sample_stage(sample, sample_size, sample_seed))
+
+    return stages
+
+
+def assign_communities(graph, seed=None):
+    '''Detect communities and store number of community of each node
+    in 'community' attribute, 0 is the largest community.
 
-    # get start number of nodes to show progress
-    start_num_nodes = graph.number_of_nodes()
+    Return modularity of found partition.'''
+    import graph.community as community
+
+    nodes = graph.nodes()
+    labels, modularity = community.communities(graph, nodes, seed=seed)
+    for node, label in zip(nodes, labels.tolist()):
+        graph.node[node]['community'] = label
+    return modularity
 
-    for n, node in enumerate(graph.nodes()):
-        gprint.print_progress(n + 1, start_num_nodes)
-        if graph.degree(node) < min_num_nodes:
-            res_graph.remove_node(node)
 
-    # need to add newline after progress bar
-    print('\n')
-    return res_graph
+def trim(graph, min_num_nodes):
+    '''Return subgraph with only nodes with number of edges greater,
+    than min_num_nodes.'''
+    return run_pipeline(graph, [trim_stage(min_num_nodes)])
 
 
 def exclude_media_activists(graph):
     '''Exclude 'media-activists' from graph.'''
+    return run_pipeline(graph, [media_activists_stage(graph)])
 
-    print('Exclude media-activists:')
-
-    avg_friends = stats.avg_num_friends(graph)
-
-    # make copy of graph to count neighbors per node
-    res_graph = graph.copy()
-
-    # get start number of nodes to show progress
-    start_num_nodes = graph.number_of_nodes()
-
-    for n, node in enumerate(graph.nodes(data=True)):
-        gprint.print_progress(n + 1, start_num_nodes)
-        if predicates.is_media_activist(node, avg_friends):
-            res_graph.remove_node(node[0])
-
-    # need to add newline after progress bar
-    print('\n')
-    return res_graph
 
 def filter_by_uids(graph, uids):
-    '''Return copy of graph with nodes containing specified uids'''
-    print('Filter by uids: {}'.format(uids))
-
-    # make copy of graph to count neighbors per node
-    res_graph = graph.copy()
-
-    # get start number of nodes to show progress
-    start_num_nodes = graph.number_of_nodes()
-
-    for n, node in enumerate(graph.nodes()):
-        gprint.print_progress(n + 1, start_num_nodes)
-        if node not in uids:
-            res_graph.remove_node(node)
-
-    # need to add newline after progress bar
-    print('\n')
-
-    return res_graph
+    '''Return subgraph with nodes containing specified uids'''
+    return run_pipeline(graph, [uids_stage(uids)])
 
 
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description=DESCRIPTION)
+def build_parser(prog=None):
+    """Return parser of command line arguments."""
+    parser = argparse.ArgumentParser(prog=prog, description=DESCRIPTION)
     parser.add_argument('src', metavar='SOURCE', type=str,
                         help='source file with graph data')
     parser.add_argument('dst', metavar='DESTINATION', type=str,
@@ -105,37 +273,137 @@ if __name__ == '__main__':
                         'less than N connected edges')
     parser.add_argument('--uids', metavar='UID', type=int,
                         nargs = '+', help='filter nodes by UIDs')
-
-
-    args = parser.parse_args()
+    parser.add_argument('--k-core', metavar='N', type=int,
+                        help='repeatedly trim nodes with less than N '
+                        'connected edges, until nothing changes')
+    parser.add_argument('--communities', action='store_true',
+                        help='detect communities and store them in '
+                        'community attribute of nodes')
+    parser.add_argument('--community-seed', metavar='SEED', type=int,
+                        help='seed of random tie-breaking in community '
+                        'detection')
+    parser.add_argument('--sample', choices=sorted(sampling.methods),
+                        help='keep only --sample-size nodes, chosen by '
+                        'random node, random edge, random walk or forest '
+                        'fire sampling; listing of candidate nodes takes '
+                        'time, linear in size of graph, the rest depends '
+                        'on size of sample')
+    parser.add_argument('--sample-size', metavar='N', type=int,
+                        help='number of nodes in sample')
+    parser.add_argument('--sample-seed', metavar='SEED', type=int,
+                        help='seed of random sampling')
+    parser.add_argument('-j', '--jobs', metavar='N', type=int, default=1,
+                        help='number of processes for per-node operations')
+    parser.add_argument('--stream', action='store_true',
+                        help='filter graph in edge list format without '
+                        'loading it into memory')
+    parser.add_argument('--in-place', action='store_true',
+                        help='remove nodes from loaded graph instead '
+                        'of building subgraph')
+    parser.add_argument('--progress-events', metavar='PATH', type=str,
+                        help='append progress events in JSON lines '
+                        'format to file, specified by PATH')
+    parser.add_argument('--memory-profiling', metavar='PATH', type=str,
+                        help='write memory usage of each operation in '
+                        'JSON format to file, specified by PATH')
+    return parser
+
+
+def main(args):
+    """Process graph with parsed command line arguments args."""
+    if args.jobs <= 0:
+        print('Number of jobs should be greater than zero.')
+        exit(1)
+
+    if args.progress_events:
+        gprint.set_progress_events(args.progress_events)
+
+    if args.memory_profiling:
+        gmemory.start_profiling()
 
     start_time = time.time()
 
-    try:
-        G = io.read_graph(args.src)
-
-        print('Graph stats before requested operations:')
-        print(nx.info(G), '\n')
-
-        if args.exclude_media_activists:
-            G = exclude_media_activists(G)
-
-        if args.uids:
-            G = filter_by_uids(G, set(args.uids))
-
-        if args.trim > DEFAULT_TRIM:
-            G = trim(G, args.trim)
+    if args.sample and (args.sample_size is None or args.sample_size < 0):
+        print('Please, specify non-negative number of nodes in sample '
+              'with --sample-size.')
+        exit(1)
+    elif not args.sample and (args.sample_size is not None or
+                              args.sample_seed is not None):
+        print('Please, specify sampling method with --sample.')
+        exit(1)
 
-        if args.exclude_alone:
-            G = trim(G, 1)
-
-        print('Graph stats after requested operations:')
-        print(nx.info(G), '\n')
-
-        io.write_graph(G, args.dst)
+    try:
+        if args.stream:
+            if args.k_core:
+                print('Iterative trim is not supported in stream mode.')
+                exit(1)
+            if args.communities:
+                print('Community detection is not supported '
+                      'in stream mode.')
+                exit(1)
+            if args.in_place:
+                print('In-place processing is not supported '
+                      'in stream mode.')
+                exit(1)
+            if args.jobs != 1:
+                print('Multiple jobs are not supported in stream mode.')
+                exit(1)
+            if args.sample:
+                print('Sampling is not supported in stream mode.')
+                exit(1)
+
+            trims = []
+            if args.trim > DEFAULT_TRIM:
+                trims.append(args.trim)
+            if args.exclude_alone:
+                trims.append(1)
+
+            import graph.stream as stream
+            with gmemory.stage('Stream filter'):
+                num_edges = stream.filter_graph(
+                    args.src, args.dst,
+                    exclude_media_activists=args.exclude_media_activists,
+                    uids=args.uids, trims=trims)
+            print('Number of edges after requested operations: '
+                  '{}\n'.format(num_edges))
+        else:
+            import networkx as nx
+            import graph.io as io
+            with gmemory.stage('Read graph'):
+                G = io.read_graph(args.src)
+
+            print('Graph stats before requested operations:')
+            print(nx.info(G), '\n')
+
+            stages = build_stages(
+                G, exclude_media_activists=args.exclude_media_activists,
+                uids=args.uids, trim=args.trim, k_core=args.k_core,
+                exclude_alone=args.exclude_alone, jobs=args.jobs,
+                sample=args.sample, sample_size=args.sample_size,
+                sample_seed=args.sample_seed)
+            G = run_pipeline(G, stages, in_place=args.in_place)
+
+            if args.communities:
+                print('Detect communities...')
+                with gmemory.stage('Detect communities'):
+                    modularity = assign_communities(G, args.community_seed)
+                print('Modularity: {}\n'.format(modularity))
+
+            print('Graph stats after requested operations:')
+            print(nx.info(G), '\n')
+
+            with gmemory.stage('Write graph'):
+                io.write_graph(G, args.dst)
     except FileNotFoundError:
         print('No such file or directory! Quitting...')
     except IOError:
         print('IOError happened! Quitting...')
     else:
         gprint.print_elapsed_time(time.time() - start_time)
+
+    if args.memory_profiling:
+        gmemory.write_report(args.memory_profiling, 'process')
+
+
+if __name__ == '__main__':
+    main(build_parser().parse_args())
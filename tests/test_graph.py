@@ -0,0 +1,164 @@
+"""Graph algorithms over CSR adjacency, checked against NetworkX
+on small synthetic graphs."""
+
+import random
+import unittest
+
+import networkx as nx
+import numpy as np
+
+import graph.arrays as arrays
+import graph.clustering as clustering
+import graph.distance as distance
+import graph.rank as rank
+import graph.synthetic as synthetic
+
+import process
+
+NUM_NODES = 200
+SEED = 1
+
+
+def _graph():
+    graph = synthetic.vk_graph(NUM_NODES, seed=SEED)
+    # self-loop, which should be handled like in NetworkX
+    graph.add_edge(0, 0)
+    return graph
+
+
+class TestCSR(unittest.TestCase):
+    def test_neighbors(self):
+        graph = _graph()
+        nodes = graph.nodes()
+        indptr, indices = arrays.csr_adjacency(graph, nodes)
+        for i, node in enumerate(nodes):
+            neighbors = indices[indptr[i]:indptr[i + 1]]
+            self.assertEqual([nodes[j] for j in neighbors],
+                             sorted(graph.adj[node], key=nodes.index))
+
+    def test_skip_other_nodes(self):
+        graph = nx.Graph([(1, 2), (2, 3), (3, 1), (3, 4)])
+        indptr, indices = arrays.csr_adjacency(graph, [3, 1, 2])
+        self.assertEqual(indptr.tolist(), [0, 2, 4, 6])
+        self.assertEqual(indices.tolist(), [1, 2, 0, 2, 0, 1])
+
+    def test_weights(self):
+        graph = nx.Graph([(1, 2), (2, 3)])
+        graph[2][3]['weight'] = 5
+        indptr, indices, weights = arrays.weighted_csr_adjacency(
+            graph, [1, 2, 3])
+        self.assertEqual(indices.tolist(), [1, 0, 2, 1])
+        self.assertEqual(weights.tolist(), [1, 1, 5, 5])
+
+
+class TestTriangles(unittest.TestCase):
+    def test_triangles(self):
+        graph = _graph()
+        nodes = graph.nodes()
+        expected = nx.triangles(graph)
+        for jobs in (1, 2):
+            counts = clustering.triangles(graph, nodes, jobs=jobs)
+            self.assertEqual(dict(zip(nodes, counts.tolist())), expected)
+
+    def test_clustering(self):
+        graph = _graph()
+        nodes = graph.nodes()
+        values = clustering.clustering(clustering.num_neighbors(graph, nodes),
+                                       clustering.triangles(graph, nodes))
+        expected = nx.clustering(graph)
+        for node, value in zip(nodes, values.tolist()):
+            self.assertAlmostEqual(value, expected[node])
+
+
+class TestKCore(unittest.TestCase):
+    def test_k_core(self):
+        graph = synthetic.vk_graph(NUM_NODES, seed=SEED)
+        for k in (2, 3, 5):
+            core = process.run_pipeline(graph, [process.k_core_stage(k)])
+            self.assertEqual(set(core.nodes()),
+                             set(nx.k_core(graph, k).nodes()))
+
+
+class TestTrim(unittest.TestCase):
+    def test_self_loops(self):
+        graph = _graph()
+        graph.add_edges_from([(NUM_NODES, NUM_NODES + 1),
+                              (NUM_NODES + 1, NUM_NODES + 1)])
+        for k in (2, 3):
+            expected = {node for node in graph if graph.degree(node) >= k}
+            for jobs in (1, 2):
+                trimmed = process.run_pipeline(
+                    graph, [process.trim_stage(k, jobs)])
+                self.assertEqual(set(trimmed.nodes()), expected)
+
+
+class TestPageRank(unittest.TestCase):
+    def assertRanksEqual(self, ranks, expected):
+        self.assertEqual(ranks.keys(), expected.keys())
+        for node in expected:
+            self.assertAlmostEqual(ranks[node], expected[node], places=8)
+
+    def test_unweighted(self):
+        graph = _graph()
+        graph.add_node(NUM_NODES)
+        self.assertRanksEqual(rank.pagerank(graph, tol=1.0e-10),
+                              nx.pagerank(graph, tol=1.0e-10))
+
+    def test_weighted(self):
+        graph = _graph()
+        rng = random.Random(SEED)
+        for u, v in graph.edges()[::3]:
+            graph[u][v]['weight'] = rng.randint(1, 10)
+        self.assertRanksEqual(rank.pagerank(graph, tol=1.0e-10),
+                              nx.pagerank(graph, tol=1.0e-10))
+        self.assertRanksEqual(
+            rank.pagerank(graph, tol=1.0e-10, weight=None),
+            nx.pagerank(graph, tol=1.0e-10, weight=None))
+
+    def test_zero_start(self):
+        graph = _graph()
+        nstart = dict.fromkeys(graph.nodes(), 0)
+        self.assertRanksEqual(
+            rank.pagerank(graph, tol=1.0e-10, nstart=nstart),
+            nx.pagerank(graph, tol=1.0e-10))
+
+
+class TestEccentricityBounds(unittest.TestCase):
+    def test_exact(self):
+        graph = _graph()
+        nodes = graph.nodes()
+        for jobs in (1, 2):
+            lower, upper = distance.eccentricity_bounds(graph, nodes,
+                                                        jobs=jobs)
+            self.assertEqual(distance.radius_bounds(lower, upper),
+                             (nx.radius(graph),) * 2)
+            self.assertEqual(distance.diameter_bounds(lower, upper),
+                             (nx.diameter(graph),) * 2)
+            certain, possible = distance.center_bounds(nodes, lower, upper)
+            self.assertEqual(certain, possible)
+            self.assertEqual(set(certain), set(nx.center(graph)))
+            certain, possible = distance.periphery_bounds(nodes, lower,
+                                                          upper)
+            self.assertEqual(certain, possible)
+            self.assertEqual(set(certain), set(nx.periphery(graph)))
+
+    def test_limited(self):
+        graph = _graph()
+        nodes = graph.nodes()
+        eccentricity = nx.eccentricity(graph)
+        expected = np.array([eccentricity[node] for node in nodes])
+        for max_bfs in (1, 3):
+            lower, upper = distance.eccentricity_bounds(graph, nodes,
+                                                        max_bfs=max_bfs)
+            self.assertTrue((lower <= expected).all())
+            self.assertTrue((expected <= upper).all())
+
+    def test_disconnected(self):
+        graph = nx.Graph([(1, 2), (3, 4)])
+        for max_bfs in (None, 0):
+            with self.assertRaises(nx.NetworkXError):
+                distance.eccentricity_bounds(graph, max_bfs=max_bfs)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+# Memory profiling of script stages with tracemalloc
+
+import contextlib
+import json
+import os
+import sys
+import tracemalloc
+
+# number of stored frames of each traced allocation
+NUM_FRAMES = 1
+# number of reported allocation sites per stage
+NUM_TOP_SITES = 10
+
+# stack of currently running stages, None if profiling is disabled
+_stack = None
+# finished stages in order of their completion
+_stages = []
+
+
+def start_profiling():
+    """Start tracing of memory allocations."""
+    global _stack
+    tracemalloc.start(NUM_FRAMES)
+    _stack = [{'name': None, 'peak': 0}]
+    del _stages[:]
+
+
+def is_profiling():
+    """Return True, if memory profiling is started."""
+    return _stack is not None
+
+
+# allocations of profiling itself are not reported as sites
+_IGNORED_FILES = (tracemalloc.__file__, __file__)
+
+
+def _format_site(statistic):
+    """Format file and line of allocation site."""
+    frame = statistic.traceback[0]
+    filename = frame.filename
+    if filename.startswith(os.getcwd() + os.sep):
+        filename = os.path.relpath(filename)
+    return '{}:{}'.format(filename, frame.lineno)
+
+
+def _top_sites(start_snapshot):
+    """Return list with top sites of memory, allocated since
+    start_snapshot.
+
+    Snapshots are not filtered, since it copies all their traces,
+    statistics of profiling itself are skipped instead.
+
+    """
+    statistics = tracemalloc.take_snapshot().compare_to(start_snapshot,
+                                                        'lineno')
+    top_sites = []
+    for statistic in statistics:
+        if len(top_sites) == NUM_TOP_SITES:
+            break
+        if statistic.size_diff <= 0 or \
+                statistic.traceback[0].filename in _IGNORED_FILES:
+            continue
+        top_sites.append({'site': _format_site(statistic),
+                          'size_diff': statistic.size_diff,
+                          'count_diff': statistic.count_diff})
+    return top_sites
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Record current and peak memory of stage and sites of memory,
+    allocated during it, if profiling is started."""
+    if _stack is None:
+        yield
+        return
+
+    # peak of outer stage is kept, while peak of this stage is traced
+    _stack[-1]['peak'] = max(_stack[-1]['peak'],
+                             tracemalloc.get_traced_memory()[1])
+    tracemalloc.reset_peak()
+    start_current = tracemalloc.get_traced_memory()[0]
+    start_snapshot = tracemalloc.take_snapshot()
+    _stack.append({'name': name, 'peak': 0})
+
+    try:
+        yield
+    finally:
+        frame = _stack.pop()
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(frame['peak'], peak)
+        top_sites = _top_sites(start_snapshot)
+        # traces of snapshot are freed before next stages
+        del start_snapshot
+
+        _stages.append({
+            'name': name,
+            'path': [outer['name'] for outer in _stack[1:]] + [name],
+            'current': current,
+            'peak': peak,
+            'allocated': current - start_current,
+            'top_sites': top_sites,
+        })
+
+        _stack[-1]['peak'] = max(_stack[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+
+
+def format_size(size):
+    """Format size in bytes in human-readable form."""
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return '{:.1f} {}'.format(size, unit)
+        size /= 1024
+    return '{:.1f} GiB'.format(size)
+
+
+def write_report(filename, script=None):
+    """Stop tracing and write recorded stages in JSON format to file.
+
+    Stages are identified by their names and names of outer stages,
+    so reports of different runs can be compared stage by stage.
+
+    """
+    global _stack
+    if _stack is None:
+        return
+
+    current, peak = tracemalloc.get_traced_memory()
+    peak = max(_stack[0]['peak'], peak)
+    tracemalloc.stop()
+    _stack = None
+
+    report = {
+        'script': script or os.path.basename(sys.argv[0]),
+        'current': current,
+        'peak': peak,
+        'stages': list(_stages),
+    }
+    with open(filename, 'w') as f:
+        json.dump(report, f, indent=1)
+
+    print('Write memory profiling information to: {0}.'.format(filename))
+    for stage_report in _stages:
+        print('  {}: peak {}, allocated {}'.format(
+            ' / '.join(stage_report['path']),
+            format_size(stage_report['peak']),
+            format_size(stage_report['allocated'])))
@@ -1,8 +1,10 @@
 # Various functions for printing various specific values
 # in human-readable format
 
+import atexit
 import sys
 import time
+import json
 import pprint
 
 # pretty print object
@@ -31,20 +33,132 @@ def print_elapsed_time(timedelta):
     print('{0} seconds.'.format(seconds), end='')
     print()
 
-def print_progress(cur_value, max_value, width=72):
-    """Print progress bar in form: [###-------]."""
-    progress = int((cur_value * 100) / max_value)
 
-    # effective width -- width of bar without brackets
-    e_width = width - 2
+# minimal interval between progress bar redraws, in seconds
+PROGRESS_INTERVAL = 0.25
 
-    # number of "#" in bar
-    num_hashes = int((cur_value * e_width) / max_value)
-    num_minuses = e_width - num_hashes
+# file for machine-readable progress events
+progress_events = None
 
-    sys.stdout.write('\r[{hashes}{minuses}] '
-                     '{percentage}%'.format(hashes='#' * num_hashes,
-                                            minuses='-' * num_minuses,
-                                            percentage=progress))
 
-    sys.stdout.flush()
+def set_progress_events(filename):
+    """Write progress events in JSON lines format to file,
+    which is closed at exit."""
+    global progress_events
+    close_progress_events()
+    progress_events = open(filename, 'a')
+    atexit.register(close_progress_events)
+
+
+def close_progress_events():
+    """Close file with progress events, if it is opened."""
+    global progress_events
+    if progress_events is not None:
+        progress_events.close()
+        progress_events = None
+
+
+def format_duration(seconds):
+    """Format duration, provided in seconds, in form [H:]MM:SS."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours > 0:
+        return '{0}:{1:02}:{2:02}'.format(hours, minutes, seconds)
+    return '{0:02}:{1:02}'.format(minutes, seconds)
+
+
+class Progress:
+    """Progress bar with throughput and ETA.
+
+    Progress bar is redrawn at most once per interval and only if
+    stdout is a terminal. If progress events file is set, each redraw
+    is also written to it as JSON object.
+
+    """
+
+    def __init__(self, total, title='', width=72,
+                 interval=PROGRESS_INTERVAL):
+        self.total = total
+        self.title = title
+        self.width = width
+        self.interval = interval
+        self.value = 0
+        self.enabled = sys.stdout.isatty()
+        self.start_time = time.monotonic()
+        self.last_time = None
+
+    def update(self, value):
+        """Set current value, redraw progress bar, if it is time to."""
+        self.value = value
+        now = time.monotonic()
+        if (self.last_time is not None and
+                now - self.last_time < self.interval):
+            return
+        self.last_time = now
+        self._report('progress', now)
+
+    def finish(self):
+        """Redraw progress bar with final value and end its line."""
+        self._report('finish', time.monotonic())
+        if self.enabled:
+            sys.stdout.write('\n')
+            sys.stdout.flush()
+
+    def _report(self, event, now):
+        if not self.enabled and progress_events is None:
+            return
+
+        elapsed = now - self.start_time
+        rate = self.value / elapsed if elapsed > 0 else 0.0
+        if rate > 0 and self.total >= self.value:
+            eta = (self.total - self.value) / rate
+        else:
+            eta = None
+
+        if self.enabled:
+            self._draw(rate, eta)
+
+        if progress_events is not None:
+            progress_events.write(json.dumps({
+                'event': event,
+                'title': self.title,
+                'value': self.value,
+                'total': self.total,
+                'elapsed': round(elapsed, 3),
+                'rate': round(rate, 3),
+                'eta': None if eta is None else round(eta, 3),
+            }) + '\n')
+            progress_events.flush()
+
+    def _draw(self, rate, eta):
+        if self.total > 0:
+            fraction = min(self.value / self.total, 1)
+        else:
+            fraction = 1
+
+        title = '{0}: '.format(self.title) if self.title else ''
+        info = ' {0}% {1:.0f}/s ETA {2}'.format(
+            int(fraction * 100), rate,
+            '--:--' if eta is None else format_duration(eta))
+
+        # effective width -- width of bar without title, brackets and info
+        e_width = max(self.width - 2 - len(title) - len(info), 10)
+
+        # number of "#" in bar
+        num_hashes = int(fraction * e_width)
+
+        sys.stdout.write('\r{title}[{hashes}{minuses}]{info}'.format(
+            title=title,
+            hashes='#' * num_hashes,
+            minuses='-' * (e_width - num_hashes),
+            info=info))
+        sys.stdout.flush()
+
+
+def iter_progress(items, title='', total=None):
+    """Iterate over items and show progress of iteration."""
+    progress = Progress(len(items) if total is None else total, title)
+    for n, item in enumerate(items):
+        yield item
+        progress.update(n + 1)
+    progress.finish()
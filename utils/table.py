@@ -0,0 +1,98 @@
+# Columnar tables of node characteristics
+
+import csv
+import heapq
+import json
+
+try:
+    import numpy as np
+except ImportError:
+    print('This script requires NumPy to be installed.')
+    exit(1)
+
+
+def select_rows(num_rows, column=None, top=None):
+    """Return sequence of indices of rows to print.
+
+    If column is specified, rows are ordered by its values in descending
+    order, otherwise, they are kept in original order. If top is
+    specified, return only first top rows. Top rows of numeric columns
+    are selected with partial sort.
+
+    """
+    if top is None or top > num_rows:
+        top = num_rows
+
+    if column is None:
+        return range(top)
+
+    if isinstance(column, np.ndarray) and column.dtype.kind in 'biuf':
+        if column.dtype.kind in 'bu':
+            # negation of boolean or unsigned values does not reverse
+            # their order
+            column = column.astype(np.int64)
+        if top < num_rows:
+            index = np.sort(np.argpartition(-column, top - 1)[:top])
+        else:
+            index = np.arange(num_rows)
+        # stable sort keeps original order of equal values
+        order = np.argsort(-column[index], kind='stable')
+        return index[order].tolist()
+
+    if top < num_rows:
+        return heapq.nlargest(top, range(num_rows), key=column.__getitem__)
+    return sorted(range(num_rows), key=column.__getitem__, reverse=True)
+
+
+def cell(value):
+    """Convert NumPy scalar to Python value, which can be printed."""
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def iter_rows(columns, rows):
+    """Iterate over lists of values in specified rows of columns.
+    Each of columns is an array or list of values, or function,
+    which returns value for index of row."""
+    for row in rows:
+        yield [cell(column(row)) if callable(column)
+               else cell(column[row]) for column in columns]
+
+
+def format_table(headers, aligns, columns, rows, float_format='5.5'):
+    """Return string with PrettyTable, which contains specified rows
+    of columns."""
+    try:
+        from prettytable import PrettyTable
+    except ImportError:
+        print('This script requires PrettyTable library to be installed.')
+        exit(1)
+
+    table = PrettyTable(headers)
+    for values in iter_rows(columns, rows):
+        table.add_row(values)
+
+    for header, align in zip(headers, aligns):
+        table.align[header] = align
+
+    table.float_format = float_format
+
+    return str(table)
+
+
+def write_csv(headers, columns, rows, f):
+    """Write specified rows of columns to file f in CSV format,
+    row by row."""
+    writer = csv.writer(f)
+    writer.writerow(headers)
+    for values in iter_rows(columns, rows):
+        writer.writerow(values)
+
+
+def write_jsonl(headers, columns, rows, f):
+    """Write specified rows of columns to file f as JSON objects,
+    one per line."""
+    for values in iter_rows(columns, rows):
+        f.write(json.dumps(dict(zip(headers, values)),
+                           ensure_ascii=False) + '\n')
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+
+START_TIME = time.perf_counter()
+
+import argparse
+import importlib
+import sys
+
+DESCRIPTION = 'Get, process, analyse and plot graphs of vk.com users'
+
+# subcommands and their descriptions, each subcommand is implemented by
+# module with the same name, which is imported only when it is used
+COMMANDS = [
+    ('get', 'get friends of vk.com users and build graph'),
+    ('process', 'filter graph and convert it between formats'),
+    ('info', 'print characteristics of graph'),
+    ('plot', 'plot graph'),
+    ('diff', 'compare two snapshots of graph'),
+    ('pipeline', 'get or read graph, process it and compute fields '
+     'of nodes in one run'),
+]
+
+
+def build_parser():
+    """Return parser of command line arguments before subcommand."""
+    epilog = 'commands:\n' + '\n'.join(
+        '  {:<10}{}'.format(name, description)
+        for name, description in COMMANDS)
+    parser = argparse.ArgumentParser(
+        description=DESCRIPTION, epilog=epilog,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--startup-time', action='store_true',
+                        help='print time spent on imports and parsing '
+                        'of arguments before COMMAND starts its work')
+    parser.add_argument('command', metavar='COMMAND',
+                        choices=[name for name, _ in COMMANDS],
+                        help='one of commands below, run '
+                        '"%(prog)s COMMAND --help" for its arguments')
+    return parser
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    # arguments after subcommand are parsed by subcommand itself
+    num_args = len(argv)
+    for i, arg in enumerate(argv):
+        if not arg.startswith('-'):
+            num_args = i + 1
+            break
+    args = build_parser().parse_args(argv[:num_args])
+
+    command = importlib.import_module(args.command)
+    command_args = command.build_parser(
+        prog='vkstat ' + args.command).parse_args(argv[num_args:])
+
+    if args.startup_time:
+        print('Startup time of {}: {:.0f} ms'.format(
+            args.command, (time.perf_counter() - START_TIME) * 1000),
+            file=sys.stderr)
+
+    command.main(command_args)
+
+
+if __name__ == '__main__':
+    main()